@@ -5,5 +5,10 @@ Tmap = lambda i, j, r: T(i, j, r)
 a = Tmap(1, 2, 1)
 b = Tmap(2, 1, 2)
 
-expr = a * b + 2 * a
-print(expr)
+
+def __getattr__(name):
+    # the example expression needs sympy: build it on first use (python -m algebra prints it)
+    if name == "expr":
+        value = globals()["expr"] = a * b + 2 * a
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,3 @@
+from algebra import expr
+
+print(expr)
@@ -0,0 +1,529 @@
+"""
+Knuth-Bendix completion of rewrite rule sets.
+
+complete() treats rules with a template right-hand side (rewrite.rule) as
+equations and turns them into a confluent, terminating, inter-reduced rule
+set for a term order: both sides of an equation are normalized with the
+rules found so far, the larger side becomes the lhs, and every overlap of
+the new rule with the others (a critical pair) is added as an equation. An
+equation that the order cannot orient, such as [x, y] = [y, x], is kept as
+an ordered rule: it rewrites an instance only when the instance decreases,
+which is what antisymmetry_rule does by hand.
+
+Overlaps are found by syntactic unification, so rules whose lhs has a
+non-ground Sum (matched up to term order) or a SeqWildcard, and rules that
+only have an rhs function, are taken as they are: they are used to
+normalize, and come first in the result, but are not overlapped.
+
+Terms are normalized modulo scalars: the numeric factors of a Product are
+multiplied into one leading coefficient (-1 * -1 * t is t, and a Product
+with a zero factor is the empty Sum), so a law such as [x, y] = -1 * [y, x]
+does not spawn a rule for every power of -1. The result is confluent up to
+that folding; Rewriter(..., collect=True) applies it to the normal forms.
+"""
+import hashlib
+import heapq
+import struct
+from fractions import Fraction
+from itertools import count
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .rewrite import (_STRUCTURAL, Atom, Commutator, Coproduct, Expr, LinComb, MultiTensor, Product,
+                      RewriteRule, Rewriter, SeqWildcard, Sum, Tensor, Wildcard, _has_ac,
+                      _wildcard_names, match, rule, scalar_value, substitute)
+
+Equation = Tuple[Expr, Expr]
+Path = Tuple[int, ...]
+
+# heads from smallest to largest: distributing a head over a smaller one decreases
+DEFAULT_PRECEDENCE = (LinComb, Sum, MultiTensor, Tensor, Product, Commutator, Coproduct)
+
+
+class CompletionError(RuntimeError):
+    pass
+
+
+class LexPathOrder:
+    """
+    Lexicographic path order for a precedence on heads.
+
+    precedence lists node types and Atom names from smallest to largest;
+    Atoms not listed are smaller than everything listed and ordered by
+    name. Sum, Product and MultiTensor heads are ranked by arity within
+    their type. On ground expressions the order is total.
+    """
+
+    def __init__(self, precedence: Sequence = DEFAULT_PRECEDENCE):
+        self.precedence = tuple(precedence)
+        self._rank = {p: k for k, p in enumerate(self.precedence)}
+
+    def __reduce__(self):
+        return type(self), (self.precedence,)
+
+    def __repr__(self):
+        names = [p if isinstance(p, str) else p.__name__ for p in self.precedence]
+        return f"LexPathOrder({names})"
+
+    def _symbol(self, expr: Expr) -> tuple:
+        if isinstance(expr, Atom):
+            rank = self._rank.get(expr.name)
+            return (-1, 0, expr.name) if rank is None else (rank, 0, "")
+        rank = self._rank.get(type(expr))
+        if rank is None:
+            raise ValueError(f"{type(expr).__name__} is not in the precedence {self!r}")
+        return rank, len(_args(expr)), ""
+
+    def greater(self, s: Expr, t: Expr) -> bool:
+        """True if s > t for every instance (s and t may contain wildcards)."""
+        memo: Dict[Tuple[Expr, Expr], bool] = {}
+
+        def gt(s, t):
+            if s is t or isinstance(s, Wildcard):
+                return False
+            if isinstance(t, Wildcard):
+                return t.name in _wildcard_names(s)
+            key = (s, t)
+            out = memo.get(key)
+            if out is None:
+                out = memo[key] = _gt(s, t)
+            return out
+
+        def _gt(s, t):
+            sargs, targs = _args(s), _args(t)
+            if any(a is t or gt(a, t) for a in sargs):
+                return True
+            f, g = self._symbol(s), self._symbol(t)
+            if f > g:
+                return all(gt(s, b) for b in targs)
+            if f == g:
+                for k, (a, b) in enumerate(zip(sargs, targs)):
+                    if a is not b:
+                        return gt(a, b) and all(gt(s, c) for c in targs[k + 1:])
+            return False
+
+        return gt(s, t)
+
+    def compare(self, s: Expr, t: Expr) -> int:
+        """1 if s > t, -1 if t > s, 0 if equal or not comparable."""
+        if self.greater(s, t):
+            return 1
+        if self.greater(t, s):
+            return -1
+        return 0
+
+
+def _args(expr: Expr) -> tuple:
+    if isinstance(expr, LinComb):
+        return tuple(m for m, _ in expr.items)
+    return expr.children
+
+
+# ---------------------------------------------------------------- unification
+
+def unify(s: Expr, t: Expr) -> Optional[Dict[str, Expr]]:
+    """Most general syntactic unifier of s and t as {wildcard name: expr}, or None.
+
+    Sums and Products are compared term by term, in order.
+    """
+    sigma: Dict[str, Expr] = {}
+    stack = [(s, t)]
+    while stack:
+        a, b = stack.pop()
+        a, b = _walk(a, sigma), _walk(b, sigma)
+        if a is b:
+            continue
+        if isinstance(b, Wildcard):
+            a, b = b, a
+        if isinstance(a, Wildcard):
+            if _occurs(a.name, b, sigma):
+                return None
+            sigma[a.name] = b
+            continue
+        if isinstance(a, SeqWildcard) or isinstance(b, SeqWildcard):
+            raise ValueError("sequence wildcards cannot be unified")
+        if type(a) is not type(b) or not isinstance(a, _STRUCTURAL):
+            return None
+        if len(a.children) != len(b.children):
+            return None
+        stack.extend(zip(a.children, b.children))
+    return {name: _resolve(value, sigma) for name, value in sigma.items()}
+
+
+def _walk(expr: Expr, sigma: Dict[str, Expr]) -> Expr:
+    while isinstance(expr, Wildcard) and expr.name in sigma:
+        expr = sigma[expr.name]
+    return expr
+
+
+def _occurs(name: str, expr: Expr, sigma: Dict[str, Expr]) -> bool:
+    stack = [expr]
+    while stack:
+        node = _walk(stack.pop(), sigma)
+        if isinstance(node, Wildcard) and node.name == name:
+            return True
+        stack.extend(node.children)
+    return False
+
+
+def _resolve(expr: Expr, sigma: Dict[str, Expr]) -> Expr:
+    names = _wildcard_names(expr)
+    while names & sigma.keys():
+        expr = instantiate(expr, sigma)
+        names = _wildcard_names(expr)
+    return expr
+
+
+def instantiate(expr: Expr, sigma: Dict[str, Expr]) -> Expr:
+    """expr with the wildcards bound in sigma replaced; the others stay."""
+    return substitute(expr, {n: sigma.get(n, Wildcard(n)) for n in _wildcard_names(expr)})
+
+
+def _rename(expr: Expr, names: Dict[str, str]) -> Expr:
+    return substitute(expr, {n: Wildcard(names.get(n, n)) for n in _wildcard_names(expr)})
+
+
+def _subterms(expr: Expr):
+    """(path, subterm) for the non-wildcard positions of expr, root first."""
+    stack: List[Tuple[Path, Expr]] = [((), expr)]
+    while stack:
+        path, node = stack.pop()
+        if isinstance(node, Wildcard):
+            continue
+        yield path, node
+        if isinstance(node, _STRUCTURAL):
+            stack.extend((path + (k,), c) for k, c in reversed(list(enumerate(node.children))))
+
+
+def _replace(expr: Expr, path: Path, new: Expr) -> Expr:
+    spine = [expr]
+    for k in path[:-1]:
+        spine.append(spine[-1].children[k])
+    for node, k in zip(reversed(spine), reversed(path)):
+        children = list(node.children)
+        children[k] = new
+        new = node.with_children(children)
+    return new
+
+
+def critical_pairs(l1: Expr, r1: Expr, l2: Expr, r2: Expr, same: bool = False) -> List[Equation]:
+    """
+    Equations from the overlaps of l2 -> r2 into l1 -> r1: for every
+    non-wildcard subterm u of l1 that unifies with l2 under sigma, the two
+    ways of rewriting sigma(l1). same=True skips the trivial root overlap
+    of a rule with itself.
+    """
+    taken = _wildcard_names(l1) | _wildcard_names(r1)
+    names = {}
+    for n in sorted(_wildcard_names(l2) | _wildcard_names(r2)):
+        fresh = n
+        while fresh in taken:
+            fresh += "'"
+        names[n] = fresh
+    l2, r2 = _rename(l2, names), _rename(r2, names)
+    pairs = []
+    for path, u in _subterms(l1):
+        if same and not path:
+            continue
+        sigma = unify(u, l2)
+        if sigma is not None:
+            pairs.append((instantiate(r1, sigma), instantiate(_replace(l1, path, r2), sigma)))
+    return pairs
+
+
+# ---------------------------------------------------------------- rules
+
+def ordered_rule(lhs: Expr, rhs: Expr, order: LexPathOrder, name: Optional[str] = None) -> RewriteRule:
+    """lhs -> rhs, applied only to instances that the order makes smaller."""
+    def rhs_func(env):
+        out = substitute(rhs, env)
+        return out if order.greater(substitute(lhs, env), out) else None
+
+    return RewriteRule(lhs, rhs_func, name if name is not None else f"{lhs!r} = {rhs!r}", rhs=rhs)
+
+
+def _is_equation(r: RewriteRule) -> bool:
+    return r.rhs is not None and not _has_ac(r.lhs) and not any(
+        isinstance(node, SeqWildcard) for _, node in _subterms(r.lhs))
+
+
+def _size(expr: Expr) -> int:
+    n, stack = 0, [expr]
+    while stack:
+        n += 1
+        stack.extend(stack.pop().children)
+    return n
+
+
+def _canonical(l: Expr, r: Expr) -> Equation:
+    """l, r with their wildcards renamed x1, x2, ... in order of appearance."""
+    names: Dict[str, str] = {}
+    stack = [r, l]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Wildcard) and node.name not in names:
+            names[node.name] = f"x{len(names) + 1}"
+        stack.extend(reversed(node.children))
+    return _rename(l, names), _rename(r, names)
+
+
+def _fold_scalars(expr: Expr) -> Expr:
+    """expr with the numeric factors of every Product multiplied into one leading coefficient."""
+    done: Dict[Expr, Expr] = {}
+    stack = [expr]
+    while stack:
+        node = stack[-1]
+        if node in done:
+            stack.pop()
+            continue
+        pending = [c for c in node.children if c not in done]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        children = [done[c] for c in node.children]
+        if isinstance(node, Product):
+            done[node] = _fold_product(children)
+        elif any(a is not b for a, b in zip(children, node.children)):
+            done[node] = node.with_children(children)
+        else:
+            done[node] = node
+    return done[expr]
+
+
+def _fold_product(factors: List[Expr]) -> Expr:
+    coeff, rest = Fraction(1), []
+    for f in Product(factors).factors:
+        value = scalar_value(f)
+        if value is not None:
+            coeff *= value
+        elif isinstance(f, Sum) and not f.terms:
+            return f
+        else:
+            rest.append(f)
+    if coeff == 0:
+        return Sum([])
+    if coeff != 1:
+        rest.insert(0, Atom(str(coeff)))
+    if not rest:
+        return Atom("1")
+    return rest[0] if len(rest) == 1 else Product(rest)
+
+
+def _usable(s: Expr, t: Expr) -> bool:
+    """True if s -> t can be a rule: s is not a wildcard and binds every wildcard of t."""
+    return not isinstance(s, Wildcard) and _wildcard_names(t) <= _wildcard_names(s)
+
+
+class Completion:
+    """State of one completion run; see complete()."""
+
+    def __init__(self, rules: List[RewriteRule], order: Optional[LexPathOrder] = None,
+                 max_rules: int = 100, max_steps: int = 10_000):
+        self.order = order or LexPathOrder()
+        self.max_rules = max_rules
+        self.max_steps = max_steps
+        self.fixed = [r for r in rules if not _is_equation(r)]
+        self.rules: List[Tuple[Expr, Expr, Optional[str]]] = []
+        self.equations: List[Equation] = []
+        self._queue: list = []
+        self._tick = count()
+        self._rewriter = Rewriter(self.fixed, cache_size=None)
+        for r in rules:
+            if _is_equation(r):
+                self._push(r.lhs, r.rhs, r.name)
+
+    def _push(self, s: Expr, t: Expr, name: Optional[str] = None):
+        heapq.heappush(self._queue, (_size(s) + _size(t), next(self._tick), s, t, name))
+
+    def _sync(self):
+        self._rewriter.rules = self.result()
+
+    def normalize(self, expr: Expr) -> Expr:
+        """Normal form of expr modulo scalars (see _fold_scalars)."""
+        while True:
+            res = self._rewriter.run(expr, self.max_steps)
+            if not res.fixpoint:
+                raise CompletionError(f"no normal form for {expr!r} within {self.max_steps} steps")
+            folded = _fold_scalars(res.expr)
+            if folded is res.expr:
+                return folded
+            expr = folded
+
+    def _ordered(self) -> List[Equation]:
+        """The ordered equations, both ways round where that can be a rule."""
+        return [(a, b) for s, t in self.equations for a, b in ((s, t), (t, s)) if _usable(a, b)]
+
+    def _subsumed(self, s: Expr, t: Expr) -> bool:
+        """True if s = t is an ordered equation instance, inside a common context."""
+        while True:
+            for a, b in self._ordered():
+                env = match(a, s)
+                if env is not None and instantiate(b, env) is t:
+                    return True
+            if type(s) is not type(t) or not isinstance(s, _STRUCTURAL):
+                return False
+            if len(s.children) != len(t.children):
+                return False
+            diff = [k for k, (a, b) in enumerate(zip(s.children, t.children)) if a is not b]
+            if len(diff) != 1:
+                return False
+            s, t = s.children[diff[0]], t.children[diff[0]]
+
+    def _add_rule(self, l: Expr, r: Expr, name: Optional[str]):
+        new = RewriteRule(l, lambda env: substitute(r, env))
+        kept = []
+        for l2, r2, n2 in self.rules:
+            if new.try_apply(l2) is not None:
+                self._push(l2, r2, n2)
+            else:
+                kept.append((l2, r2, n2))
+        self.rules = kept
+        eqs = []
+        for s, t in self.equations:
+            if new.try_apply(s) is not None or new.try_apply(t) is not None:
+                self._push(s, t)
+            else:
+                eqs.append((s, t))
+        self.equations = eqs
+        self.rules.append((l, r, name))
+        self._sync()
+        self.rules = [(l2, self.normalize(r2), n2) for l2, r2, n2 in self.rules]
+        self._sync()
+        self._overlap([(l, r)])
+
+    def _add_equation(self, s: Expr, t: Expr):
+        directions = [(a, b) for a, b in ((s, t), (t, s)) if _usable(a, b)]
+        if not directions:
+            raise CompletionError(f"cannot orient {s!r} = {t!r}")
+        self.equations.append((s, t))
+        self._sync()
+        self._overlap(directions)
+
+    def _overlap(self, new: List[Equation]):
+        for l1, r1 in new:
+            for l2, r2 in [(l, r) for l, r, _ in self.rules] + self._ordered():
+                same = l1 is l2 and r1 is r2
+                for s, t in critical_pairs(l1, r1, l2, r2, same):
+                    self._push(s, t)
+                if not same:
+                    for s, t in critical_pairs(l2, r2, l1, r1):
+                        self._push(s, t)
+
+    def step(self) -> bool:
+        """Process one pending equation; False when none is left."""
+        if not self._queue:
+            return False
+        _, _, s, t, name = heapq.heappop(self._queue)
+        s, t = self.normalize(s), self.normalize(t)
+        if s is t:
+            return True
+        c = self.order.compare(s, t)
+        if c != 0:
+            l, r = (s, t) if c > 0 else (t, s)
+            if name is None:
+                l, r = _canonical(l, r)
+            self._add_rule(l, r, name)
+        elif not self._subsumed(s, t):
+            self._add_equation(*_canonical(s, t))
+        if len(self.rules) + len(self.equations) > self.max_rules:
+            raise CompletionError(f"more than {self.max_rules} rules; the completion may not terminate "
+                                  f"for {self.order!r}")
+        return True
+
+    def run(self) -> List[RewriteRule]:
+        while self.step():
+            pass
+        return self.result()
+
+    def result(self) -> List[RewriteRule]:
+        out = list(self.fixed)
+        out.extend(rule(l, r, name) for l, r, name in self.rules)
+        out.extend(ordered_rule(s, t, self.order) if _usable(s, t) else ordered_rule(t, s, self.order)
+                   for s, t in self.equations)
+        return out
+
+
+def complete(rules: List[RewriteRule], order: Optional[LexPathOrder] = None,
+             max_rules: int = 100, max_steps: int = 10_000) -> List[RewriteRule]:
+    """
+    Complete rules for order (default LexPathOrder()).
+
+    The result lists the rules taken as they are, then the oriented rules,
+    then the ordered ones. Raises CompletionError after max_rules rules,
+    or when a term has no normal form within max_steps rewrites.
+    """
+    return Completion(rules, order, max_rules, max_steps).run()
+
+
+# Cached rule sets: header, the YGXE stream of all rule sides, then one
+# record per rule: lhs root, rhs root, kind, name length + 1 (0: no name), name.
+_RULES_MAGIC = b"YGXR"
+_RULES_HEADER = struct.Struct("<4sQI")  # magic, length of the expression stream, n_rules
+_RULE_RECORD = struct.Struct("<IIBI")
+_ORIENTED, _ORDERED = 0, 1
+
+
+def _dump_rules(records: List[Tuple[Expr, Expr, int, Optional[str]]]) -> bytes:
+    from .serialize import dumps_exprs
+
+    exprs = dumps_exprs([e for l, r, _, _ in records for e in (l, r)])
+    out = [_RULES_HEADER.pack(_RULES_MAGIC, len(exprs), len(records)), exprs]
+    for k, (_, _, kind, name) in enumerate(records):
+        data = b"" if name is None else name.encode("utf-8")
+        out.append(_RULE_RECORD.pack(2 * k, 2 * k + 1, kind, 0 if name is None else len(data) + 1))
+        out.append(data)
+    return b"".join(out)
+
+
+def _load_rules(data: bytes) -> List[Tuple[Expr, Expr, int, Optional[str]]]:
+    from .serialize import FormatError, loads_exprs
+
+    magic, length, count = _RULES_HEADER.unpack_from(data, 0)
+    if magic != _RULES_MAGIC:
+        raise FormatError("not a completed rule set")
+    off = _RULES_HEADER.size
+    exprs = loads_exprs(data[off:off + length])
+    off += length
+    records = []
+    for _ in range(count):
+        lhs, rhs, kind, size = _RULE_RECORD.unpack_from(data, off)
+        off += _RULE_RECORD.size
+        name = None
+        if size:
+            name = data[off:off + size - 1].decode("utf-8")
+            off += size - 1
+        records.append((exprs[lhs], exprs[rhs], kind, name))
+    return records
+
+
+def cached_complete(rules: List[RewriteRule], order: Optional[LexPathOrder] = None,
+                    max_rules: int = 100, max_steps: int = 10_000, cache=None) -> List[RewriteRule]:
+    """
+    complete(), computed once per serialize.DiskCache. The key covers the
+    equations, the order and the names and lhs of the rules taken as they
+    are (their rhs functions cannot be hashed, so rename one that changes).
+    """
+    from .serialize import DiskCache, dumps_exprs
+
+    order = order or LexPathOrder()
+    fixed = [r for r in rules if not _is_equation(r)]
+    equations = [r for r in rules if _is_equation(r)]
+    digest = hashlib.sha256(dumps_exprs([e for r in equations for e in (r.lhs, r.rhs)])).hexdigest()
+    parts = ("completion", digest, tuple(r.name for r in equations), repr(order),
+             tuple((r.name, repr(r.lhs)) for r in fixed), max_rules, max_steps)
+
+    def compute():
+        done = Completion(rules, order, max_rules, max_steps)
+        done.run()
+        records = [(l, r, _ORIENTED, name) for l, r, name in done.rules]
+        records.extend((s, t, _ORDERED, None) if _usable(s, t) else (t, s, _ORDERED, None)
+                       for s, t in done.equations)
+        return _dump_rules(records)
+
+    path = (cache or DiskCache()).get_or_create(parts, compute, ".ygxr")
+    with open(path, "rb") as fh:
+        records = _load_rules(fh.read())
+    out = list(fixed)
+    for l, r, kind, name in records:
+        out.append(rule(l, r, name) if kind == _ORIENTED else ordered_rule(l, r, order, name))
+    return out
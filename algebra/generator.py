@@ -1,23 +1,98 @@
-import sympy as sp
+from functools import lru_cache
 
 
-class T(sp.Function):
-    nargs = 3
+class T:
+    """
+    Generator T_ij^(r), interned on the integer triple (i, j, r).
 
-    @classmethod
-    def eval(cls, i, j, r):
-        return None
+    A plain Python object: sympy is only imported when a sympy API needs the
+    generator (sympify, arithmetic, matrices), which goes through _sympy_().
+    """
+    __slots__ = ("i", "j", "r", "_sym")
+    _interned = {}
 
-    def _sympystr(self, printer):
-        i, j, r = self.args
-        return f"T_{{{i}{j}}}^({r})"
+    def __new__(cls, i, j, r):
+        key = (int(i), int(j), int(r))
+        self = cls._interned.get(key)
+        if self is None:
+            self = object.__new__(cls)
+            self.i, self.j, self.r = key
+            self._sym = None
+            cls._interned[key] = self
+        return self
 
-    def _latex(self, printer=None):
-        i, j, r = self.args
-        return f"T_{{{i}{j}}}^{{({r})}}"
+    @property
+    def args(self):
+        return self.i, self.j, self.r
+
+    def __reduce__(self):
+        return T, self.args
+
+    def _sympy_(self):
+        if self._sym is None:
+            self._sym = sympy_generator()(*self.args)
+        return self._sym
+
+    def __add__(self, other):
+        return self._sympy_() + other
+
+    def __radd__(self, other):
+        return other + self._sympy_()
+
+    def __sub__(self, other):
+        return self._sympy_() - other
+
+    def __rsub__(self, other):
+        return other - self._sympy_()
+
+    def __mul__(self, other):
+        return self._sympy_() * other
+
+    def __rmul__(self, other):
+        return other * self._sympy_()
+
+    def __truediv__(self, other):
+        return self._sympy_() / other
+
+    def __rtruediv__(self, other):
+        return other / self._sympy_()
+
+    def __pow__(self, other):
+        return self._sympy_() ** other
+
+    def __neg__(self):
+        return -self._sympy_()
 
     def __str__(self):
-        return self._sympystr(None)
+        return f"T_{{{self.i}{self.j}}}^({self.r})"
+
+    __repr__ = __str__
+
+
+@lru_cache(maxsize=None)
+def sympy_generator():
+    """The sympy function class that T(i, j, r) converts to."""
+    import sympy as sp
+
+    class T(sp.Function):
+        nargs = 3
+
+        @classmethod
+        def eval(cls, i, j, r):
+            return None
+
+        def _sympystr(self, printer):
+            i, j, r = self.args
+            return f"T_{{{i}{j}}}^({r})"
+
+        def _latex(self, printer=None):
+            i, j, r = self.args
+            return f"T_{{{i}{j}}}^{{({r})}}"
+
+        def __str__(self):
+            return self._sympystr(None)
+
+        def __repr__(self):
+            return self._sympystr(None)
 
-    def __repr__(self):
-        return self._sympystr(None)
+    return T
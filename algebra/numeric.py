@@ -0,0 +1,447 @@
+"""
+Fast probabilistic checks with NumPy.
+
+Representations used here are fundamental spin chains
+T(z) = (1 + c_1/z)(I + P_01/z) ... (1 + c_L/z)(I + P_0L/z) on (C^n)^{⊗L},
+conjugated by random matrices in the auxiliary and quantum spaces. They are
+polynomial in 1/z, satisfy RTT = TTR for R(u) = I + P/u and have T^(0) = I.
+
+Expressions (rewrite.Expr) are evaluated in such representations, batched
+over spectral shifts, through compiled EvaluationPlans.
+"""
+from math import comb
+from typing import NamedTuple
+
+import numpy as np
+
+from algebra.rewrite import Atom, Commutator, LinComb, MultiTensor, Product, Sum, Tensor, scalar_value
+from algebra.yangian import generator_key
+
+
+class NumericCheck(NamedTuple):
+    passed: bool
+    max_residual: float
+
+
+def _generator_key(g):
+    if isinstance(g, tuple):
+        return g
+    return tuple(int(a) for a in g.args)
+
+
+class NumericRepresentation:
+    """Matrices of the generators T_ij^(r); coeffs[r, i-1, j-1] is T_ij^(r)."""
+
+    def __init__(self, coeffs):
+        self.coeffs = coeffs
+        self.max_order = coeffs.shape[0] - 1
+        self.n = coeffs.shape[1]
+        self.dim = coeffs.shape[3]
+
+    def __getitem__(self, g):
+        """Matrix of a generator given as (i, j, r) or generator.T(i, j, r)."""
+        i, j, r = _generator_key(g)
+        if r > self.max_order:
+            return np.zeros((self.dim, self.dim), dtype=self.coeffs.dtype)
+        return self.coeffs[r, i - 1, j - 1]
+
+    def evaluate(self, zs):
+        """T(z) for a batch of spectral parameters: shape (len(zs), n, n, dim, dim)."""
+        zs = np.asarray(zs, dtype=complex)
+        powers = zs[:, None] ** -np.arange(self.max_order + 1)
+        return np.einsum('br,rijxy->bijxy', powers, self.coeffs)
+
+
+def random_representation(n=2, sites=3, rng=None) -> NumericRepresentation:
+    rng = np.random.default_rng(rng)
+    dim = n ** sites
+    eye_q = np.eye(dim)
+    # coefficients of T(x), x = 1/z, as (order, n, n, dim, dim)
+    T = np.zeros((1, n, n, dim, dim), dtype=complex)
+    for i in range(n):
+        T[0, i, i] = eye_q
+    for site in range(sites):
+        # L(x) = (1 + c x)(I + x E), E_ab = e_ba acting on this site
+        E = np.zeros((n, n, dim, dim))
+        for a in range(n):
+            for b in range(n):
+                unit = np.zeros((n, n))
+                unit[b, a] = 1
+                E[a, b] = np.kron(np.kron(np.eye(n ** site), unit), np.eye(n ** (sites - site - 1)))
+        identity = np.zeros_like(E)
+        for a in range(n):
+            identity[a, a] = eye_q
+        c = rng.normal()
+        L = np.stack([identity, E + c * identity, c * E])
+        out = np.zeros((T.shape[0] + 2, n, n, dim, dim), dtype=complex)
+        for r in range(T.shape[0]):
+            for s in range(3):
+                out[r + s] += np.einsum('iaxy,ajyz->ijxz', T[r], L[s])
+        T = out
+    A = rng.normal(size=(n, n)) + 1j * rng.normal(size=(n, n))
+    S = rng.normal(size=(dim, dim)) + 1j * rng.normal(size=(dim, dim))
+    T = np.einsum('ia,rabxy,bj->rijxy', A, T, np.linalg.inv(A))
+    T = S @ T @ np.linalg.inv(S)
+    return NumericRepresentation(T)
+
+
+def rtt_residual(rep: NumericRepresentation, zs, ws) -> float:
+    """max |R(z-w) T1(z) T2(w) - T2(w) T1(z) R(z-w)| over the sample points, relative to |T1 T2|."""
+    zs = np.asarray(zs, dtype=complex)
+    ws = np.asarray(ws, dtype=complex)
+    Tz, Tw = rep.evaluate(zs), rep.evaluate(ws)
+    inv = (1 / (zs - ws))[:, None, None, None, None, None, None]
+    # indices [b, i, j, k, l, x, y]
+    zw = np.einsum('bijxy,bklyz->bijklxz', Tz, Tw)   # T_ij(z) T_kl(w)
+    wz = np.einsum('bklxy,bijyz->bijklxz', Tw, Tz)   # T_kl(w) T_ij(z)
+    lhs = zw + inv * zw.transpose(0, 3, 2, 1, 4, 5, 6)
+    rhs = wz + inv * wz.transpose(0, 1, 4, 3, 2, 5, 6)
+    return float(np.abs(lhs - rhs).max() / max(1.0, np.abs(zw).max()))
+
+
+def check_rtt_numeric(n=2, sites=2, samples=32, representations=4, seed=None,
+                      tol=1e-9) -> NumericCheck:
+    """
+    Probabilistic RTT = TTR check: random representations evaluated at random
+    complex (z, w) pairs, batched over the samples.
+    """
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for _ in range(representations):
+        rep = random_representation(n, sites, rng)
+        zs = rng.normal(size=samples) + 1j * rng.normal(size=samples)
+        ws = zs + np.exp(2j * np.pi * rng.random(samples)) * rng.uniform(0.5, 2.0, samples)
+        worst = max(worst, rtt_residual(rep, zs, ws))
+    return NumericCheck(worst <= tol, worst)
+
+
+def check_relation_table_numeric(table, n=2, sites=3, representations=2, seed=None,
+                                 tol=1e-9) -> NumericCheck:
+    """
+    Check a commutation table such as relations.rtt_commutation_table in
+    random representations: both sides of every [T_a, T_b] = sum c * monomial
+    are compared as matrices.
+    """
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for _ in range(representations):
+        rep = random_representation(n, sites, rng)
+        scale = max(1.0, np.abs(rep.coeffs).max() ** 2)
+        eye = np.eye(rep.dim)
+        for (g, h), relation in table.items():
+            a, b = rep[g], rep[h]
+            residual = a @ b - b @ a
+            for monomial, c in relation.items():
+                term = eye
+                for factor in monomial:
+                    term = term @ rep[factor]
+                residual = residual - float(c) * term
+            worst = max(worst, float(np.abs(residual).max() / scale))
+    return NumericCheck(worst <= tol, worst)
+
+
+# ------------------------------------------------------------ expression evaluation
+
+class EvaluationRepresentation:
+    """
+    A batch of evaluation representations T(u) -> rep(T)(u - a), one per shift a.
+
+    The shift automorphism sends T_ij^(r) to sum_{s=1}^{r} C(r-1, s-1) a^(r-s) T_ij^(s),
+    so every atom becomes a (batch, dim, dim) array: 'Tij_r' through rep, '1'
+    and numeric atoms as multiples of the identity, anything else from the
+    atoms mapping {name: (dim, dim) or (batch, dim, dim) array}.
+    """
+
+    def __init__(self, rep: NumericRepresentation, shifts, atoms=None):
+        self.rep = rep
+        self.shifts = np.asarray(shifts, dtype=complex)
+        self.batch = len(self.shifts)
+        self.dim = rep.dim
+        self.atoms = dict(atoms or {})
+        self._cache = {}
+
+    def generator(self, i, j, r):
+        """rep(T_ij^(r)) at every shift, (batch, dim, dim)."""
+        key = (i, j, r)
+        out = self._cache.get(key)
+        if out is None:
+            if not (1 <= i <= self.rep.n and 1 <= j <= self.rep.n):
+                raise KeyError(f"T_{i}{j}^({r}) is not a generator of gl({self.rep.n})")
+            out = np.zeros((self.batch, self.dim, self.dim), dtype=complex)
+            if r == 0:
+                if i == j:
+                    out[:] = np.eye(self.dim)
+            for s in range(1, min(r, self.rep.max_order) + 1):
+                weight = comb(r - 1, s - 1) * self.shifts ** (r - s)
+                out += weight[:, None, None] * self.rep[i, j, s]
+            out.flags.writeable = False
+            self._cache[key] = out
+        return out
+
+    def atom(self, atom):
+        out = self._cache.get(atom)
+        if out is not None:
+            return out
+        value = scalar_value(atom)
+        if value is not None:
+            out = np.broadcast_to(complex(value) * np.eye(self.dim), (self.batch, self.dim, self.dim))
+        elif atom.name in self.atoms:
+            out = np.broadcast_to(np.asarray(self.atoms[atom.name], dtype=complex),
+                                  (self.batch, self.dim, self.dim))
+        else:
+            key = generator_key(atom.name)
+            if key is None or key.typ != "T":
+                raise KeyError(f"no matrix for atom {atom.name!r}")
+            i, j = divmod(key.index, 10)
+            out = self.generator(i, j, key.level)
+        self._cache[atom] = out
+        return out
+
+
+class EvaluationPlan:
+    """
+    An expression compiled against an EvaluationRepresentation.
+
+    Nodes are visited once (interned subexpressions are shared) and turned
+    into steps writing into numbered buffers; a buffer is handed to a later
+    step of the same size once its value has been used for the last time,
+    and the buffers are kept between runs. A sum of tensors is one step,
+    factored on its legs (sum_x A_x ⊗ (sum ...)) and vectorized over all
+    prefixes of the same length (see _emit_tensor_sum).
+    """
+
+    def __init__(self, expr, evrep: EvaluationRepresentation):
+        self.evrep = evrep
+        self.steps = []
+        self._sizes = []       # buffer id -> matrix size
+        self._free = {}        # matrix size -> free buffer ids
+        self._consts = {}      # const id -> array (atom matrices)
+        self._buffers = None
+        self._uses = _count_uses(expr)
+        self._done = {}        # node -> (slot, size)
+        self.root, self.size = self._compile(expr)
+
+    # slots: ('c', k) for constants, ('b', k) for buffers
+
+    def _buffer(self, size):
+        free = self._free.get(size)
+        if free:
+            return ('b', free.pop())
+        self._sizes.append(size)
+        return ('b', len(self._sizes) - 1)
+
+    def _release(self, node):
+        self._uses[node] -= 1
+        if self._uses[node] == 0:
+            slot, size = self._done[node]
+            if slot[0] == 'b':
+                self._free.setdefault(size, []).append(slot[1])
+
+    def _compile(self, expr):
+        stack = [expr]
+        while stack:
+            node = stack[-1]
+            if node in self._done:
+                stack.pop()
+                continue
+            children = _plan_children(node)
+            pending = [c for c in children if c not in self._done]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            self._done[node] = self._emit(node)
+            for c in children:
+                self._release(c)
+        return self._done[expr]
+
+    def _emit(self, node):
+        if isinstance(node, Atom):
+            self._consts[len(self._consts)] = self.evrep.atom(node)
+            return ('c', len(self._consts) - 1), self.evrep.dim
+        if isinstance(node, (Tensor, MultiTensor)):
+            legs = MultiTensor([node]).legs
+            return self._emit_tensor_sum([(legs, 1)])
+        if isinstance(node, (Sum, LinComb)):
+            tensors = _tensor_items(node)
+            if tensors is not None:
+                return self._emit_tensor_sum(tensors)
+            args = [(complex(c), self._done[m]) for m, c in _items(node)]
+            # an empty sum is the zero operator on one leg
+            size = _common_size(node, [s for _, (_, s) in args]) if args else self.evrep.dim
+            out = self._buffer(size)
+            self.steps.append(('lincomb', out, [(c, slot) for c, (slot, _) in args]))
+            return out, size
+        if isinstance(node, (Product, Commutator)):
+            args = [self._done[c] for c in node.children]
+            size = _common_size(node, [s for _, s in args])
+            out = self._buffer(size)
+            op = 'matmul' if isinstance(node, Product) else 'commutator'
+            self.steps.append((op, out, [slot for slot, _ in args]))
+            return out, size
+        raise TypeError(f"cannot evaluate {type(node).__name__}")
+
+    def _emit_tensor_sum(self, items):
+        """
+        sum c * leg_1 ⊗ ... ⊗ leg_k as one vectorized step. Terms are sorted
+        on their legs and reduced from the last leg to the first: at level L
+        every distinct length-L prefix gets the sum of kron(leg, suffix value)
+        over its children, so each prefix is a single batched Kronecker product.
+        """
+        k = len(items[0][0])
+        if any(len(legs) != k for legs, _ in items):
+            raise ValueError("terms with different numbers of tensor legs")
+        positions = [{} for _ in range(k)]
+        rows, coeffs = [], []
+        for legs, c in items:
+            rows.append([pos.setdefault(leg, len(pos)) for pos, leg in zip(positions, legs)])
+            coeffs.append(complex(c))
+        leg_slots, leg_sizes = [], []
+        for pos in positions:
+            done = [self._done[leg] for leg in pos]
+            leg_slots.append([slot for slot, _ in done])
+            leg_sizes.append(_common_size(None, [size for _, size in done]))
+        idx = np.array(rows, dtype=np.int64).reshape(len(rows), k)
+        order = np.lexsort(idx.T[::-1])
+        idx, coeffs = idx[order], np.array(coeffs, dtype=complex)[order]
+        # changed[t, l]: rows t and t+1 differ within their first l+1 legs
+        changed = np.logical_or.accumulate(idx[1:] != idx[:-1], axis=1)
+        starts = [np.zeros(1, dtype=np.int64)]      # starts[L]: first row of each length-L prefix
+        for L in range(1, k + 1):
+            starts.append(np.concatenate(([0], 1 + np.flatnonzero(changed[:, L - 1]))))
+        levels = []
+        for L in range(k, 0, -1):
+            legs = idx[starts[L], L - 1]
+            # children of a length L-1 prefix: consecutive length-L prefixes
+            first = np.searchsorted(starts[L], starts[L - 1])
+            counts = np.diff(np.append(first, len(starts[L])))
+            levels.append((L - 1, legs, first, counts))
+        size = int(np.prod(leg_sizes))
+        out = self._buffer(size)
+        self.steps.append(('tensorsum', out, (leg_slots, leg_sizes, starts[k], coeffs, levels)))
+        return out, size
+
+    def _value(self, slot):
+        kind, k = slot
+        return self._consts[k] if kind == 'c' else self._buffers[k]
+
+    def run(self):
+        """Evaluate: an array (batch, size, size). It is a plan buffer, overwritten by the next run."""
+        batch = self.evrep.batch
+        if self._buffers is None:
+            self._buffers = [np.empty((batch, s, s), dtype=complex) for s in self._sizes]
+        for op, out, args in self.steps:
+            dst = self._value(out)
+            if op == 'lincomb':
+                dst[:] = 0
+                for c, slot in args:
+                    dst += c * self._value(slot)
+            elif op == 'matmul':
+                np.matmul(self._value(args[0]), self._value(args[1]), out=dst)
+                for slot in args[2:]:
+                    dst[:] = dst @ self._value(slot)
+            elif op == 'commutator':
+                a, b = self._value(args[0]), self._value(args[1])
+                np.matmul(a, b, out=dst)
+                dst -= b @ a
+            else:
+                dst[:] = self._tensor_sum(*args)[0]
+        return self._value(self.root)
+
+    __call__ = run
+
+    def _tensor_sum(self, leg_slots, leg_sizes, rows, coeffs, levels):
+        batch = self.evrep.batch
+        value = np.add.reduceat(coeffs, rows)[:, None, None, None] * np.ones((1, batch, 1, 1))
+        suffix = 1
+        for position, legs, first, counts in levels:
+            mats = np.stack([self._value(slot) for slot in leg_slots[position]])
+            d = leg_sizes[position]
+            size = d * suffix
+            new = np.empty((len(first), batch, d, suffix, d, suffix), dtype=complex)
+            # the r-th children of all parents at once, in chunks of at most _CHUNK_BYTES;
+            # every parent has a first child, which is written in place
+            step = max(1, _CHUNK_BYTES // (16 * batch * size * size))
+            for r in range(int(counts.max())):
+                owners = np.arange(len(first)) if r == 0 else np.flatnonzero(counts > r)
+                for lo in range(0, len(owners), step):
+                    chunk = owners[lo:lo + step]
+                    children = first[chunk] + r
+                    a = mats[legs[children]][:, :, :, None, :, None]
+                    b = value[children][:, :, None, :, None, :]
+                    if r == 0:
+                        np.multiply(a, b, out=new[lo:lo + step])
+                    else:
+                        new[chunk] += a * b
+            new = new.reshape(len(first), batch, size, size)
+            value, suffix = new, size
+        return value
+
+
+def _items(node):
+    """(monomial, coeff) pairs of a Sum or LinComb."""
+    return node.items if isinstance(node, LinComb) else [(t, 1) for t in node.terms]
+
+
+def _tensor_items(node):
+    """(legs, coeff) pairs if node is a Sum/LinComb of tensors only, else None."""
+    items = _items(node)
+    if items and all(isinstance(m, (Tensor, MultiTensor)) for m, _ in items):
+        return [(m.legs if isinstance(m, MultiTensor) else MultiTensor([m]).legs, c) for m, c in items]
+    return None
+
+
+_CHUNK_BYTES = 1 << 26
+
+
+def _plan_children(node):
+    """Subexpressions a plan evaluates before node (tensor legs, not the Tensor nodes)."""
+    if isinstance(node, (Tensor, MultiTensor)):
+        return list(dict.fromkeys(MultiTensor([node]).legs))
+    if isinstance(node, (Sum, LinComb)):
+        tensors = _tensor_items(node)
+        if tensors is not None:
+            return list(dict.fromkeys(leg for legs, _ in tensors for leg in legs))
+        return [m for m, _ in _items(node)]
+    if isinstance(node, (Product, Commutator)):
+        return list(node.children)
+    return []
+
+
+def _count_uses(expr):
+    uses = {expr: 1}
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        for c in _plan_children(node):
+            if c not in uses:
+                uses[c] = 0
+                stack.append(c)
+            uses[c] += 1
+    return uses
+
+
+def _common_size(node, sizes):
+    if len(set(sizes)) > 1:
+        raise ValueError(f"matrix sizes {sorted(set(sizes))} do not match" + (f" in {node!r}" if node else ""))
+    return sizes[0]
+
+
+def compile_expr(expr, evrep: EvaluationRepresentation) -> EvaluationPlan:
+    return EvaluationPlan(expr, evrep)
+
+
+def evaluate(expr, evrep: EvaluationRepresentation):
+    """expr as matrices, (batch, size, size), one per shift of evrep."""
+    return compile_expr(expr, evrep).run().copy()
+
+
+def check_identity_numeric(lhs, rhs, n=2, sites=2, samples=8, seed=None, tol=1e-9,
+                           atoms=None) -> NumericCheck:
+    """lhs == rhs evaluated in a random spin-chain representation at random shifts."""
+    rng = np.random.default_rng(seed)
+    rep = random_representation(n, sites, rng)
+    evrep = EvaluationRepresentation(rep, rng.normal(size=samples) + 1j * rng.normal(size=samples), atoms)
+    a, b = compile_expr(lhs, evrep).run(), compile_expr(rhs, evrep).run()
+    worst = float(np.abs(a - b).max() / max(1.0, np.abs(a).max()))
+    return NumericCheck(worst <= tol, worst)
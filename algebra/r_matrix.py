@@ -15,9 +15,72 @@ def permutation_matrix(n):
     return P
 
 
+def swap_index(k, n):
+    """Index of e_j ⊗ e_i given the index k = i*n + j of e_i ⊗ e_j."""
+    i, j = divmod(k, n)
+    return j * n + i
+
+
+class RMatrix:
+    """
+    R(z) = I + P/z on C^n ⊗ C^n with I and P kept implicit.
+
+    Basis vector e_i ⊗ e_j has index i*n + j. Multiplying a matrix by R only
+    permutes its rows (R * M) or columns (M * R); use to_dense() to get the
+    sympy matrix.
+    """
+    # take precedence over sympy matrices in M * R
+    _op_priority = 20
+
+    def __init__(self, z, n=2):
+        self.z = z
+        self.n = n
+        self.p_coeff = sp.S.One / z
+        self._perm = [swap_index(k, n) for k in range(n * n)]
+
+    @property
+    def shape(self):
+        return self.n * self.n, self.n * self.n
+
+    def apply(self, i, j):
+        """R(z)(e_i ⊗ e_j) as {(k, l): coefficient of e_k ⊗ e_l}."""
+        if i == j:
+            return {(i, i): 1 + self.p_coeff}
+        return {(i, j): sp.S.One, (j, i): self.p_coeff}
+
+    def entry(self, row, col):
+        value = sp.S.One if row == col else sp.S.Zero
+        if self._perm[row] == col:
+            value += self.p_coeff
+        return value
+
+    def nonzeros(self):
+        """Yield (row, col, value) for the n² + n(n-1) nonzero entries."""
+        for row in range(self.n * self.n):
+            col = self._perm[row]
+            if col == row:
+                yield row, row, 1 + self.p_coeff
+            else:
+                yield row, row, sp.S.One
+                yield row, col, self.p_coeff
+
+    def __mul__(self, M):
+        if isinstance(M, RMatrix):
+            return self.to_dense() * M.to_dense()
+        # (P M)[i*n+j, :] = M[j*n+i, :]
+        return M + self.p_coeff * M.extract(self._perm, list(range(M.cols)))
+
+    def __rmul__(self, M):
+        # (M P)[:, i*n+j] = M[:, j*n+i]
+        return M + self.p_coeff * M.extract(list(range(M.rows)), self._perm)
+
+    def to_dense(self):
+        return identity_matrix(self.n) + permutation_matrix(self.n) * self.p_coeff
+
+    def __repr__(self):
+        return f"RMatrix(z={self.z}, n={self.n})"
+
+
 def R_matrix(z, n=2):
     """Return R(z) = I + P/z for GL(n)"""
-    I = identity_matrix(n)
-    P = permutation_matrix(n)
-    return I + P / z
-
+    return RMatrix(z, n).to_dense()
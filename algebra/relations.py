@@ -1,15 +1,36 @@
-import sympy as sp
-from .r_matrix import R_matrix
-from .t_matrix import T_matrix
+from typing import Dict, Tuple
 
+# (i, j, r) stands for the generator T_ij^(r); indices are 1-based as in generator.T.
+GeneratorKey = Tuple[int, int, int]
+# Ordered product of generators; () is the unit.
+Monomial = Tuple[GeneratorKey, ...]
+# [T_ij^(r), T_kl^(s)] as {monomial: integer coefficient}
+Relation = Dict[Monomial, int]
+CommutationTable = Dict[Tuple[GeneratorKey, GeneratorKey], Relation]
 
-def check_RTT_relation(z, w):
-    R = R_matrix(z - w)
-    Tz = T_matrix(z)
-    Tw = T_matrix(w)
 
-    T1 = sp.kronecker_product(Tz, sp.eye(2))
-    T2 = sp.kronecker_product(sp.eye(2), Tw)
+def check_RTT_relation(z, w, n=2, max_order=2, mode="symbolic"):
+    """
+    mode="numeric" runs the probabilistic NumPy check of algebra.numeric
+    instead of the exact sympy comparison (z, w and max_order unused).
+    """
+    if mode == "numeric":
+        from .numeric import check_rtt_numeric
+        return check_rtt_numeric(n).passed
+    if mode != "symbolic":
+        raise ValueError(f"unknown mode {mode!r}")
+
+    # sympy only for the symbolic mode
+    import sympy as sp
+    from .r_matrix import RMatrix
+    from .t_matrix import T_matrix
+
+    R = RMatrix(z - w, n)
+    Tz = T_matrix(z, max_order, n)
+    Tw = T_matrix(w, max_order, n)
+
+    T1 = sp.kronecker_product(Tz, sp.eye(n))
+    T2 = sp.kronecker_product(sp.eye(n), Tw)
 
     lhs = sp.simplify(R * T1 * T2)
     rhs = sp.simplify(T2 * T1 * R)
@@ -18,16 +39,64 @@ def check_RTT_relation(z, w):
     print("Difference:")
     sp.pprint(diff)
 
-    return diff == sp.zeros(4, 4)
+    return diff == sp.zeros(n * n, n * n)
+
+
+def commutator_relation(i, j, r, k, l, s) -> Relation:
+    """
+    [T_ij^(r), T_kl^(s)] read off coefficient by coefficient from
+    R(z-w) T1(z) T2(w) = T2(w) T1(z) R(z-w) with R(u) = I + P/u and T^(0) = I:
+
+        [T_ij^(r), T_kl^(s)] = sum_{a=1}^{min(r,s)} T_kj^(r+s-a) T_il^(a-1) - T_kj^(a-1) T_il^(r+s-a)
+
+    Factors T^(0) are replaced by Kronecker deltas.
+    """
+    out: Relation = {}
+
+    def add(monomial, c):
+        out[monomial] = out.get(monomial, 0) + c
+
+    for a in range(1, min(r, s) + 1):
+        high = r + s - a
+        if a == 1:
+            if i == l:
+                add(((k, j, high),), 1)
+            if k == j:
+                add(((i, l, high),), -1)
+        else:
+            add(((k, j, high), (i, l, a - 1)), 1)
+            add(((k, j, a - 1), (i, l, high)), -1)
+    return {m: c for m, c in out.items() if c != 0}
+
+
+def rtt_commutation_table(n=2, max_order=2) -> CommutationTable:
+    """All relations [T_ij^(r), T_kl^(s)] of the gl(n) Yangian for 1 <= r, s <= max_order."""
+    gens = [(i, j, r) for r in range(1, max_order + 1)
+            for i in range(1, n + 1) for j in range(1, n + 1)]
+    return {(g, h): commutator_relation(*g, *h) for g in gens for h in gens}
+
+
+def extract_commutators_from_rtt(z, w, n=2, max_order=2, mode="symbolic"):
+    """
+    mode="symbolic" expands RTT = TTR with sympy and prints the nonzero entries;
+    mode="coefficients" returns rtt_commutation_table(n, max_order) (z, w unused).
+    """
+    if mode == "coefficients":
+        return rtt_commutation_table(n, max_order)
+    if mode != "symbolic":
+        raise ValueError(f"unknown mode {mode!r}")
 
+    # sympy only for the symbolic mode
+    import sympy as sp
+    from .r_matrix import RMatrix
+    from .t_matrix import T_matrix
 
-def extract_commutators_from_rtt(z, w):
-    R = R_matrix(z - w)
-    Tz = T_matrix(z)
-    Tw = T_matrix(w)
+    R = RMatrix(z - w, n)
+    Tz = T_matrix(z, max_order, n)
+    Tw = T_matrix(w, max_order, n)
 
-    T1 = sp.kronecker_product(Tz, sp.eye(2))
-    T2 = sp.kronecker_product(sp.eye(2), Tw)
+    T1 = sp.kronecker_product(Tz, sp.eye(n))
+    T2 = sp.kronecker_product(sp.eye(n), Tw)
 
     lhs = sp.expand(R * T1 * T2)
     rhs = sp.expand(T2 * T1 * R)
@@ -1,26 +1,86 @@
-from typing import Dict, List, Optional, Callable
+import importlib
+import marshal
+import pickle
+import types
+import weakref
+from collections import OrderedDict
+from fractions import Fraction
+from functools import cmp_to_key
+from time import perf_counter
+from typing import Dict, List, Optional, Callable, Tuple, NamedTuple
+
+
+# Every node is immutable and hash-consed: constructing a node that is
+# structurally equal to a live one returns the existing instance, so equality
+# is identity and hashes are computed once from the (already interned) children.
+_interned: "weakref.WeakValueDictionary[tuple, Expr]" = weakref.WeakValueDictionary()
+
+
+def _intern(cls, values: tuple) -> 'Expr':
+    key = (cls,) + values
+    node = _interned.get(key)
+    if node is None:
+        node = object.__new__(cls)
+        for field, value in zip(cls._fields, values):
+            object.__setattr__(node, field, value)
+        object.__setattr__(node, "_hash", hash(key))
+        node = _interned.setdefault(key, node)
+    return node
 
 
 class Expr:
-    """Base expression class. Subclass for Atom (generators, symbols), Sum, Product, Commutator, Coproduct, Tensor."""
+    """Base expression class. Subclass for Atom (generators, symbols), Sum, Product, Commutator, Coproduct, Tensor.
+
+    Nodes are interned and immutable; two expressions are equal iff they are the same object.
+    """
+    __slots__ = ("_hash", "_sort_key", "__weakref__")
+    _fields: Tuple[str, ...] = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, f) for f in self._fields)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @property
+    def children(self) -> Tuple['Expr', ...]:
+        return ()
+
+    def with_children(self, children) -> 'Expr':
+        return self
 
     def subs(self, mapping: Dict[str, 'Expr']) -> 'Expr':
         return self
 
 
 class Atom(Expr):
-    def __init__(self, name: str):
-        self.name = name
+    __slots__ = ("name",)
+    _fields = ("name",)
+
+    def __new__(cls, name: str):
+        return _intern(cls, (name,))
 
     def __repr__(self):
         return self.name
 
-    def __eq__(self, other):
-        return isinstance(other, Atom) and self.name == other.name
-
 
 class Sum(Expr):
-    def __init__(self, terms: List[Expr]):
+    __slots__ = ("terms",)
+    _fields = ("terms",)
+
+    def __new__(cls, terms: List[Expr]):
         # flatten
         flat: List[Expr] = []
         for t in terms:
@@ -28,222 +88,1336 @@ class Sum(Expr):
                 flat.extend(t.terms)
             else:
                 flat.append(t)
-        self.terms = flat
+        return _intern(cls, (tuple(flat),))
+
+    @property
+    def children(self):
+        return self.terms
+
+    def with_children(self, children):
+        return Sum(children)
 
     def __repr__(self):
         return "(" + " + ".join(map(repr, self.terms)) + ")"
 
-    def __eq__(self, other):
-        return isinstance(other, Sum) and self.terms == other.terms
-
 
 class Product(Expr):
-    def __init__(self, factors: List[Expr]):
+    __slots__ = ("factors",)
+    _fields = ("factors",)
+
+    def __new__(cls, factors: List[Expr]):
         flat: List[Expr] = []
         for f in factors:
             if isinstance(f, Product):
                 flat.extend(f.factors)
             else:
                 flat.append(f)
-        self.factors = flat
+        return _intern(cls, (tuple(flat),))
+
+    @property
+    def children(self):
+        return self.factors
+
+    def with_children(self, children):
+        return Product(children)
 
     def __repr__(self):
         return "(" + " * ".join(map(repr, self.factors)) + ")"
 
-    def __eq__(self, other):
-        return isinstance(other, Product) and self.factors == other.factors
-
 
 class Commutator(Expr):
-    def __init__(self, a: Expr, b: Expr):
-        self.a = a
-        self.b = b
+    __slots__ = ("a", "b")
+    _fields = ("a", "b")
+
+    def __new__(cls, a: Expr, b: Expr):
+        return _intern(cls, (a, b))
+
+    @property
+    def children(self):
+        return (self.a, self.b)
+
+    def with_children(self, children):
+        return Commutator(*children)
 
     def __repr__(self):
         return f"[{self.a},{self.b}]"
 
-    def __eq__(self, other):
-        return isinstance(other, Commutator) and self.a == other.a and self.b == other.b
-
 
 class Coproduct(Expr):
-    def __init__(self, a: Expr):
-        self.a = a
+    __slots__ = ("a",)
+    _fields = ("a",)
+
+    def __new__(cls, a: Expr):
+        return _intern(cls, (a,))
+
+    @property
+    def children(self):
+        return (self.a,)
+
+    def with_children(self, children):
+        return Coproduct(*children)
 
     def __repr__(self):
         return f"Δ({self.a})"
 
-    def __eq__(self, other):
-        return isinstance(other, Coproduct) and self.a == other.a
-
 
 class Tensor(Expr):
-    def __init__(self, left: Expr, right: Expr):
-        self.left = left
-        self.right = right
+    __slots__ = ("left", "right")
+    _fields = ("left", "right")
+
+    def __new__(cls, left: Expr, right: Expr):
+        return _intern(cls, (left, right))
+
+    @property
+    def children(self):
+        return (self.left, self.right)
+
+    def with_children(self, children):
+        return Tensor(*children)
 
     def __repr__(self):
         return f"({self.left} ⊗ {self.right})"
 
-    def __eq__(self, other):
-        return isinstance(other, Tensor) and self.left == other.left and self.right == other.right
+
+class MultiTensor(Expr):
+    """Flat tensor product leg_1 ⊗ ... ⊗ leg_k; nested Tensor/MultiTensor legs are spliced in."""
+    __slots__ = ("legs",)
+    _fields = ("legs",)
+
+    def __new__(cls, legs: List[Expr]):
+        flat: List[Expr] = []
+        stack = list(reversed(legs))
+        while stack:
+            leg = stack.pop()
+            if isinstance(leg, Tensor):
+                stack.append(leg.right)
+                stack.append(leg.left)
+            elif isinstance(leg, MultiTensor):
+                stack.extend(reversed(leg.legs))
+            else:
+                flat.append(leg)
+        return _intern(cls, (tuple(flat),))
+
+    @property
+    def children(self):
+        return self.legs
+
+    def with_children(self, children):
+        return MultiTensor(children)
+
+    def to_tree(self) -> Expr:
+        """Left-associated binary Tensor with the same legs."""
+        cur = self.legs[0]
+        for leg in self.legs[1:]:
+            cur = Tensor(cur, leg)
+        return cur
+
+    def __repr__(self):
+        return "(" + " ⊗ ".join(map(repr, self.legs)) + ")"
+
+
+Coeff = Fraction
+
+
+class LinComb(Expr):
+    """Linear combination c1*m1 + c2*m2 + ... with exact rational coefficients.
+
+    Built from (expr, coeff) pairs or a dict; Sums, scalar factors and nested
+    LinCombs in the input are expanded, like monomials are merged and zero
+    coefficients dropped, so equal combinations are the same node.
+    """
+    __slots__ = ("items",)
+    _fields = ("items",)
+
+    def __new__(cls, items=()):
+        if isinstance(items, dict):
+            items = items.items()
+        coeffs: Dict[Expr, Fraction] = {}
+        for expr, c in items:
+            if c == 0:
+                continue
+            if _is_monomial(expr):
+                coeffs[expr] = coeffs.get(expr, 0) + Fraction(c)
+            else:
+                for m, d in collect(expr).items:
+                    coeffs[m] = coeffs.get(m, 0) + d * c
+        return cls._make(coeffs)
+
+    @classmethod
+    def _make(cls, coeffs: Dict[Expr, Fraction]) -> 'LinComb':
+        # coeffs keys must already be monomials
+        pairs = [(m, Fraction(c)) for m, c in coeffs.items() if c != 0]
+        _sort_structurally(pairs, lambda p: p[0])
+        return _intern(cls, (tuple(pairs),))
+
+    @property
+    def children(self):
+        return tuple(m for m, _ in self.items)
+
+    def with_children(self, children):
+        return LinComb(zip(children, (c for _, c in self.items)))
+
+    def coefficient(self, monomial: Expr) -> Fraction:
+        for m, c in self.items:
+            if m is monomial:
+                return c
+        return Fraction(0)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __add__(self, other):
+        return LinComb(self.items + collect(other).items)
+
+    def __sub__(self, other):
+        return self + (-1) * collect(other)
+
+    def __neg__(self):
+        return (-1) * self
+
+    def __mul__(self, scalar):
+        return LinComb._make({m: c * scalar for m, c in self.items})
+
+    __rmul__ = __mul__
+
+    def __repr__(self):
+        if not self.items:
+            return "0"
+        out = []
+        for k, (m, c) in enumerate(self.items):
+            sign = "-" if c < 0 else "+"
+            c = abs(c)
+            body = repr(m) if c == 1 else f"{c}*{m!r}"
+            if k == 0:
+                out.append(body if sign == "+" else "-" + body)
+            else:
+                out.append(f" {sign} {body}")
+        return "(" + "".join(out) + ")"
+
+
+ONE = Atom("1")
+
+
+def scalar_value(expr: Expr) -> Optional[Fraction]:
+    """Numeric value of an atom such as '-1', '2' or '1/2', else None."""
+    if isinstance(expr, Atom):
+        try:
+            return Fraction(expr.name)
+        except ValueError:
+            return None
+    return None
+
+
+def _is_monomial(expr: Expr) -> bool:
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (Sum, LinComb)):
+            return False
+        if isinstance(node, Atom):
+            if node is not ONE and scalar_value(node) is not None:
+                return False
+        elif isinstance(node, Product):
+            if len(node.factors) < 2:
+                return False
+            for f in node.factors:
+                if isinstance(f, Atom) and scalar_value(f) is not None:
+                    return False
+                stack.append(f)
+        elif isinstance(node, (Tensor, MultiTensor, Commutator)):
+            stack.extend(node.children)
+    return True
+
+
+def _mul_monomials(a: Expr, b: Expr) -> Expr:
+    if a is ONE:
+        return b
+    if b is ONE:
+        return a
+    return Product([a, b])
+
+
+_LINEAR = (Sum, Product, Tensor, MultiTensor, Commutator)
+
+
+def collect(expr: Expr) -> LinComb:
+    """Expand expr into a LinComb of monomials, merging like terms.
+
+    Sums, numeric atoms and LinCombs are linear structure; Products, Tensors
+    and Commutators are expanded multilinearly (keeping factor order), so
+    scalars inside a bracket are pulled out. Anything else, e.g. a Coproduct,
+    is a monomial.
+    """
+    if isinstance(expr, LinComb):
+        return expr
+    # coefficient dicts of the subterms; sorted into a LinComb only at the root
+    done: Dict[Expr, Dict[Expr, Fraction]] = {}
+    stack = [expr]
+    while stack:
+        node = stack[-1]
+        if node in done:
+            stack.pop()
+            continue
+        if isinstance(node, _LINEAR):
+            pending = [c for c in node.children if c not in done]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            done[node] = _collect_node(node, [done[c].items() for c in node.children])
+        else:
+            stack.pop()
+            done[node] = _collect_leaf(node)
+    return LinComb._make(done[expr])
+
+
+def _collect_leaf(expr: Expr) -> Dict[Expr, Fraction]:
+    if isinstance(expr, LinComb):
+        return dict(expr.items)
+    if isinstance(expr, Atom):
+        value = scalar_value(expr)
+        if value is not None:
+            return {ONE: value} if value else {}
+    return {expr: Fraction(1)}
+
+
+def _collect_node(expr: Expr, parts) -> Dict[Expr, Fraction]:
+    """Coefficients of a Sum/Product/Tensor/MultiTensor/Commutator given its children's."""
+    if isinstance(expr, Sum):
+        coeffs: Dict[Expr, Fraction] = {}
+        for items in parts:
+            for m, c in items:
+                coeffs[m] = coeffs.get(m, 0) + c
+        return _nonzero(coeffs)
+    if isinstance(expr, Product):
+        acc = {ONE: Fraction(1)}
+        for items in parts:
+            coeffs = {}
+            for m1, c1 in acc.items():
+                for m2, c2 in items:
+                    m = _mul_monomials(m1, m2)
+                    coeffs[m] = coeffs.get(m, 0) + c1 * c2
+            acc = _nonzero(coeffs)
+        return acc
+    if isinstance(expr, (Tensor, Commutator)):
+        coeffs = {}
+        left, right = parts
+        for m1, c1 in left:
+            for m2, c2 in right:
+                m = type(expr)(m1, m2)
+                coeffs[m] = coeffs.get(m, 0) + c1 * c2
+        return _nonzero(coeffs)
+    acc = {(): Fraction(1)}
+    for items in parts:
+        legs = {}
+        for ms, c1 in acc.items():
+            for m, c2 in items:
+                key = ms + (m,)
+                legs[key] = legs.get(key, 0) + c1 * c2
+        acc = _nonzero(legs)
+    return {MultiTensor(ms): c for ms, c in acc.items()}
+
+
+def _nonzero(coeffs: dict) -> dict:
+    return {m: c for m, c in coeffs.items() if c != 0}
+
+
+# Structural total order. Keys compare by node type first, then by atom name
+# or by the children's keys; they are computed once per (interned) node.
+_TYPE_RANK: Dict[type, int] = {}
+
+
+def _node_sort_key(node: Expr) -> tuple:
+    rank = _TYPE_RANK.get(type(node), len(_TYPE_RANK))
+    if isinstance(node, (Atom, Wildcard, SeqWildcard)):
+        return rank, node.name
+    if isinstance(node, LinComb):
+        return rank, tuple((m._sort_key, c) for m, c in node.items)
+    return rank, tuple(c._sort_key for c in node.children)
+
+
+def sort_key(expr: Expr) -> tuple:
+    """Cached key of the structural total order on expressions."""
+    key = getattr(expr, "_sort_key", None)
+    if key is not None:
+        return key
+    stack = [expr]
+    while stack:
+        node = stack[-1]
+        if getattr(node, "_sort_key", None) is not None:
+            stack.pop()
+            continue
+        pending = [c for c in node.children if getattr(c, "_sort_key", None) is None]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        object.__setattr__(node, "_sort_key", _node_sort_key(node))
+    return expr._sort_key
+
+
+def _compare_keys(a: tuple, b: tuple) -> int:
+    """Compare two sort keys like tuples do, without recursing into nested keys."""
+    stack = [(a, b, 0)]
+    while stack:
+        x, y, i = stack.pop()
+        if i == len(x) or i == len(y):
+            if len(x) != len(y):
+                return -1 if len(x) < len(y) else 1
+            continue
+        stack.append((x, y, i + 1))
+        u, v = x[i], y[i]
+        if u is v:
+            continue
+        if isinstance(u, tuple) and isinstance(v, tuple):
+            stack.append((u, v, 0))
+        elif u != v:
+            return -1 if u < v else 1
+    return 0
+
+
+def _sort_structurally(items: list, expr_of: Callable = lambda e: e):
+    # Tuple comparison recurses in C, so keys of two deep expressions that
+    # differ only far down overflow the stack; those are compared iteratively.
+    try:
+        items.sort(key=lambda item: sort_key(expr_of(item)))
+    except RecursionError:
+        items.sort(key=cmp_to_key(lambda p, q: _compare_keys(sort_key(expr_of(p)), sort_key(expr_of(q)))))
 
 
 # Patterns and matching
 class Wildcard(Expr):
-    def __init__(self, name: str):
-        self.name = name
+    __slots__ = ("name",)
+    _fields = ("name",)
+
+    def __new__(cls, name: str):
+        return _intern(cls, (name,))
 
     def __repr__(self):
         return f"?{self.name}"
 
 
+class SeqWildcard(Expr):
+    """Sequence wildcard: inside a Sum pattern it binds the Sum of the remaining terms."""
+    __slots__ = ("name",)
+    _fields = ("name",)
+
+    def __new__(cls, name: str):
+        return _intern(cls, (name,))
+
+    def __repr__(self):
+        return f"?{self.name}*"
+
+
+_TYPE_RANK.update({cls: rank for rank, cls in enumerate(
+    (Atom, Wildcard, SeqWildcard, Commutator, Coproduct, Product, Tensor, MultiTensor, Sum, LinComb))})
+
 Match = Optional[Dict[str, Expr]]
 
+# node types that match, substitute and try_apply look inside
+_STRUCTURAL = (Sum, Product, Commutator, Coproduct, Tensor, MultiTensor)
+
 
 def match(pattern: Expr, expr: Expr, env: Optional[Dict[str, Expr]] = None) -> Match:
+    """First env under which pattern matches expr, or None.
+
+    Sum patterns match up to term order (see _sum_task); every other node
+    matches positionally.
+    """
     if env is None:
         env = {}
-    # Wildcard matches
-    if isinstance(pattern, Wildcard):
-        prev = env.get(pattern.name)
-        if prev is None:
-            env[pattern.name] = expr
-            return env
+    return _match_stack(((pattern, expr), None), env)
+
+
+def _match_stack(goals, env):
+    """Match the (pattern, expr) pairs of the linked list goals, extending env.
+
+    goals is (pair, rest) or None; a (None, task) pair stands for the
+    unassigned terms of a Sum pattern. Choosing which term a pattern term
+    takes is the only branching: each open alternative is a choice point on
+    an explicit stack, holding the goals to resume with and how many
+    bindings of the trail to undo, so neither the expression depth nor the
+    number of open choices costs recursion, and backtracking copies nothing.
+    On failure env is left as it was.
+    """
+    trail: List[str] = []
+    # (trail mark, goals, Sum pattern, expr) for an untried match up to term order,
+    # (trail mark, goals, term pattern, task, positions left) for untried term choices
+    choices: list = []
+    while goals is not None:
+        (pattern, expr), goals = goals
+        if pattern is None:
+            ok, goals = _sum_step(expr, env, trail, choices, goals)
+        elif isinstance(pattern, Wildcard):
+            prev = env.get(pattern.name)
+            if prev is None:
+                env[pattern.name] = expr
+                trail.append(pattern.name)
+                ok = True
+            else:
+                ok = prev is expr or _ac_form(prev) is _ac_form(expr)
+        elif isinstance(pattern, Atom):
+            ok = pattern is expr
+        elif isinstance(pattern, SeqWildcard):
+            raise ValueError(f"sequence wildcard {pattern!r} outside a Sum pattern")
+        elif type(pattern) is not type(expr) or not isinstance(pattern, _STRUCTURAL):
+            ok = False
+        elif _is_ground(pattern):
+            ok = pattern is expr or _ac_form(pattern) is _ac_form(expr)
+        elif isinstance(pattern, Sum):
+            pterms, eterms = pattern.terms, expr.terms
+            ok = True
+            if len(pterms) == len(eterms) and _sum_plan(pattern)[2] is None:
+                # the positional assignment first: it is usually the one that matches
+                choices.append((len(trail), goals, pattern, expr))
+                for pair in reversed(tuple(zip(pterms, eterms))):
+                    goals = (pair, goals)
+            else:
+                task = _sum_task(pattern, eterms, env)
+                ok = task is not None
+                goals = ((None, task), goals)
         else:
-            return env if prev == expr else None
-    # Match Atom
-    if isinstance(pattern, Atom) and isinstance(expr, Atom):
-        return env if pattern.name == expr.name else None
-    if type(pattern) is type(expr):
-        if isinstance(pattern, Sum):
-            if len(pattern.terms) != len(expr.terms):
+            pchildren, echildren = pattern.children, expr.children
+            ok = len(pchildren) == len(echildren)
+            for pair in reversed(tuple(zip(pchildren, echildren))):
+                goals = (pair, goals)
+        if not ok:
+            goals = _backtrack(env, trail, choices)
+            if goals is None:
                 return None
-            for pterm, eterm in zip(pattern.terms, expr.terms):
-                env = match(pterm, eterm, env)
-                if env is None:
-                    return None
-            return env
-        if isinstance(pattern, Product):
-            if len(pattern.factors) != len(expr.factors):
+    return env
+
+
+def _sum_step(task, env, trail, choices, goals):
+    """Assign the next term of a Sum task; (False, goals) if none fits."""
+    order, k, eterms, used, seq, index = task
+    if k == len(order):
+        if seq is None:
+            return True, goals
+        rest = Sum([t for n, t in enumerate(eterms) if n not in used])
+        prev = env.get(seq)
+        if prev is None:
+            env[seq] = rest
+            trail.append(seq)
+            return True, goals
+        # bound meanwhile, by another occurrence inside this Sum's terms
+        return _same_terms(prev, rest), goals
+    p = order[k]
+    options = _term_choices(p, env, eterms, used, index)
+    if not options:
+        return False, goals
+    if len(options) > 1:
+        choices.append((len(trail), goals, p, task, options[:0:-1]))
+    return True, _assign(p, task, options[0], goals)
+
+
+def _assign(p, task, n, goals):
+    order, k, eterms, used, seq, index = task
+    return (p, eterms[n]), ((None, (order, k + 1, eterms, used | {n}, seq, index)), goals)
+
+
+def _backtrack(env, trail, choices):
+    """Goals of the next open alternative, with env restored to its choice point; None when exhausted."""
+    while choices:
+        point = choices[-1]
+        mark, goals = point[0], point[1]
+        while len(trail) > mark:
+            del env[trail.pop()]
+        if len(point) == 4:
+            # the positional assignment failed: match the Sum up to term order
+            choices.pop()
+            pattern, expr = point[2], point[3]
+            task = _sum_task(pattern, expr.terms, env)
+            if task is not None:
+                return (None, task), goals
+            continue
+        p, task, rest = point[2], point[3], point[4]
+        n = rest.pop()
+        if not rest:
+            choices.pop()
+        return _assign(p, task, n, goals)
+    while trail:
+        del env[trail.pop()]
+    return None
+
+
+# per Sum pattern: (term patterns in search order, their groundness, sequence wildcard name)
+_sum_plans: "weakref.WeakKeyDictionary[Expr, tuple]" = weakref.WeakKeyDictionary()
+
+
+def _sum_plan(pattern: 'Sum') -> tuple:
+    plan = _sum_plans.get(pattern)
+    if plan is None:
+        seq = [p for p in pattern.terms if isinstance(p, SeqWildcard)]
+        if len(seq) > 1:
+            raise ValueError("at most one sequence wildcard per Sum pattern")
+        fixed = [p for p in pattern.terms if not isinstance(p, SeqWildcard)]
+        # ground terms first (identity lookups), then structured ones, bare wildcards last
+        fixed.sort(key=lambda p: (not _is_ground(p), isinstance(p, Wildcard)))
+        plan = _sum_plans[pattern] = (tuple(fixed), tuple(map(_is_ground, fixed)),
+                                      seq[0].name if seq else None)
+    return plan
+
+
+def _sum_task(pattern: 'Sum', eterms: tuple, env: Dict[str, Expr]):
+    """Set up matching pattern's terms against eterms as multisets; None if hopeless.
+
+    Candidate terms are indexed by _ac_form (for ground pattern terms and
+    bound wildcards) and by head type (for structured ones); a SeqWildcard
+    takes whatever is left over, as a Sum.
+    """
+    order, ground, seq = _sum_plan(pattern)
+    if seq is not None and seq in env:
+        # already bound: its terms must all be there
+        order += env[seq].terms
+        ground += (True,) * len(env[seq].terms)
+        seq = None
+    if len(order) > len(eterms) or (seq is None and len(order) != len(eterms)):
+        return None
+    positions: Dict[Expr, List[int]] = {}
+    by_head: Dict[type, List[int]] = {}
+    for n, t in enumerate(eterms):
+        positions.setdefault(_ac_form(t), []).append(n)
+        by_head.setdefault(type(t), []).append(n)
+    need: Dict[Expr, int] = {}
+    for p, g in zip(order, ground):
+        if g:
+            key = _ac_form(p)
+            need[key] = need.get(key, 0) + 1
+            if need[key] > len(positions.get(key, ())):
+                return None
+    return order, 0, eterms, frozenset(), seq, (positions, by_head)
+
+
+def _term_choices(p: Expr, env: Dict[str, Expr], eterms: tuple, used, index) -> List[int]:
+    """Positions p may take, in term order; equal terms are interchangeable, so one of each."""
+    positions, by_head = index
+    if isinstance(p, Wildcard):
+        bound = env.get(p.name)
+        candidates = range(len(eterms)) if bound is None else positions.get(_ac_form(bound), ())
+    elif isinstance(p, Atom) or _ac_form(p) in positions:
+        candidates = positions.get(_ac_form(p), ())
+    else:
+        candidates = by_head.get(type(p), ())
+    choices, seen = [], set()
+    for n in candidates:
+        t = eterms[n]
+        if n not in used and t not in seen:
+            seen.add(t)
+            choices.append(n)
+    return choices
+
+
+Matcher = Callable[[Expr, Dict[str, Expr]], Match]
+
+
+# whether each node is free of wildcards
+_grounds: "weakref.WeakKeyDictionary[Expr, bool]" = weakref.WeakKeyDictionary()
+
+
+def _is_ground(pattern: Expr) -> bool:
+    if pattern in _grounds:
+        return _grounds[pattern]
+    stack = [pattern]
+    while stack:
+        node = stack[-1]
+        if node in _grounds:
+            stack.pop()
+            continue
+        pending = [c for c in node.children if c not in _grounds]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        _grounds[node] = not isinstance(node, (Wildcard, SeqWildcard)) and all(_grounds[c] for c in node.children)
+    return _grounds[pattern]
+
+
+def _wildcard_names(pattern: Expr) -> set:
+    names = set()
+    stack = [pattern]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (Wildcard, SeqWildcard)):
+            names.add(node.name)
+        stack.extend(node.children)
+    return names
+
+
+def _has_ac(pattern: Expr) -> bool:
+    """True if pattern contains a Sum subpattern that may match in more than one way."""
+    stack = [pattern]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Sum) and not _is_ground(node):
+            return True
+        stack.extend(node.children)
+    return False
+
+
+def _same_terms(a: 'Sum', b: 'Sum') -> bool:
+    """True if the Sums a and b have the same terms, counted with multiplicity."""
+    return a is b or _ac_form(a) is _ac_form(b)
+
+
+def _has_sum(expr: Expr) -> bool:
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Sum):
+            return True
+        stack.extend(node.children)
+    return False
+
+
+# representative of each node up to the order of Sum terms; None: the node itself
+_ac_forms: "weakref.WeakKeyDictionary[Expr, Optional[Expr]]" = weakref.WeakKeyDictionary()
+
+
+def _ac_form(expr: Expr) -> Expr:
+    """expr with the terms of every Sum in it sorted by sort_key.
+
+    Sum patterns match up to term order, so two expressions are equal for
+    matching purposes iff their forms are the same node.
+    """
+    if not isinstance(expr, _STRUCTURAL):
+        return expr
+    if expr in _ac_forms:
+        return _ac_forms[expr] or expr
+    stack = [expr]
+    while stack:
+        node = stack[-1]
+        if node in _ac_forms:
+            stack.pop()
+            continue
+        pending = [c for c in node.children if isinstance(c, _STRUCTURAL) and c not in _ac_forms]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        children = [(_ac_forms.get(c) or c) if isinstance(c, _STRUCTURAL) else c for c in node.children]
+        if isinstance(node, Sum):
+            _sort_structurally(children)
+        form = node.with_children(children)
+        _ac_forms[node] = None if form is node else form
+    return _ac_forms[expr] or expr
+
+
+def compile_pattern(pattern: Expr) -> Matcher:
+    """Compile pattern into a matcher(expr, env) equivalent to match(pattern, expr, env).
+
+    Wildcard-free subpatterns become identity checks (nodes are interned; with
+    a Sum inside, on their _ac_form), the
+    head type and arity are checked before any child is looked at, and ground
+    children are compared before wildcards are bound. Sum patterns match up to
+    term order; children are matched independently only when no Sum in one can
+    constrain another through a shared wildcard.
+    """
+    if isinstance(pattern, Wildcard):
+        name = pattern.name
+
+        def match_wildcard(expr, env):
+            prev = env.get(name)
+            if prev is None:
+                env[name] = expr
+                return env
+            return env if prev is expr or _ac_form(prev) is _ac_form(expr) else None
+        return match_wildcard
+
+    if _is_ground(pattern):
+        if _has_sum(pattern):
+            form = _ac_form(pattern)
+
+            def match_ground_ac(expr, env):
+                return env if expr is pattern or _ac_form(expr) is form else None
+            return match_ground_ac
+
+        def match_ground(expr, env):
+            return env if expr is pattern else None
+        return match_ground
+
+    if isinstance(pattern, SeqWildcard):
+        raise ValueError(f"sequence wildcard {pattern!r} outside a Sum pattern")
+
+    cls = type(pattern)
+    if cls is Sum:
+        terms = pattern.terms
+        positional = None
+        if not any(isinstance(p, SeqWildcard) for p in terms):
+            positional = tuple(compile_pattern(p) for p in terms)
+
+        def match_sum(expr, env):
+            if type(expr) is not Sum:
                 return None
-            for pf, ef in zip(pattern.factors, expr.factors):
-                env = match(pf, ef, env)
-                if env is None:
+            if positional is not None and len(expr.terms) == len(terms):
+                trial = dict(env)
+                if all(sub(t, trial) is not None for sub, t in zip(positional, expr.terms)):
+                    env.update(trial)
+                    return env
+            return match(pattern, expr, env)
+        return match_sum
+
+    children = pattern.children
+    names = [_wildcard_names(c) for c in children]
+    for k, c in enumerate(children):
+        if _has_ac(c) and any(names[k] & names[m] for m in range(len(children)) if m != k):
+            # the first match of c need not be the one its siblings agree with
+            return lambda expr, env: match(pattern, expr, env)
+
+    # ground children first, bare wildcards last: cheap mismatches fail early
+    order = sorted(range(len(children)),
+                   key=lambda k: (isinstance(children[k], Wildcard), not _is_ground(children[k])))
+    subs = tuple((k, compile_pattern(children[k])) for k in order)
+
+    if cls in (Product, MultiTensor):
+        field = cls._fields[0]
+        arity = len(children)
+
+        def match_variadic(expr, env):
+            if type(expr) is not cls:
+                return None
+            items = getattr(expr, field)
+            if len(items) != arity:
+                return None
+            for k, sub in subs:
+                if sub(items[k], env) is None:
                     return None
             return env
-        if isinstance(pattern, Commutator):
-            env = match(pattern.a, expr.a, env)
-            if env is None: return None
-            env = match(pattern.b, expr.b, env)
-            return env
-        if isinstance(pattern, Coproduct):
-            return match(pattern.a, expr.a, env)
-        if isinstance(pattern, Tensor):
-            env = match(pattern.left, expr.left, env)
-            if env is None: return None
-            env = match(pattern.right, expr.right, env)
-            return env
-    return None
+        return match_variadic
+
+    if cls not in (Commutator, Coproduct, Tensor):
+        # no positional structure to specialize on
+        return lambda expr, env: match(pattern, expr, env)
+
+    fields = tuple(cls._fields[k] for k, _ in subs)
+    if len(subs) == 1:
+        (_, sub), = subs
+        field, = fields
+
+        def match_unary(expr, env):
+            if type(expr) is not cls:
+                return None
+            return sub(getattr(expr, field), env)
+        return match_unary
+
+    if len(subs) == 2:
+        (_, sub1), (_, sub2) = subs
+        field1, field2 = fields
+
+        def match_binary(expr, env):
+            if type(expr) is not cls:
+                return None
+            if sub1(getattr(expr, field1), env) is None:
+                return None
+            return sub2(getattr(expr, field2), env)
+        return match_binary
+
+    pairs = tuple(zip(fields, (sub for _, sub in subs)))
+
+    def match_fixed(expr, env):
+        if type(expr) is not cls:
+            return None
+        for field, sub in pairs:
+            if sub(getattr(expr, field), env) is None:
+                return None
+        return env
+    return match_fixed
 
 
 # Rewrites
 class RewriteRule:
-    def __init__(self, lhs: Expr, rhs_func: Callable[[Dict[str, Expr]], Expr]):
+    def __init__(self, lhs: Expr, rhs_func: Callable[[Dict[str, Expr]], Expr], name: Optional[str] = None,
+                 rhs: Optional[Expr] = None):
         self.lhs = lhs
         self.rhs_func = rhs_func
+        # the template rhs_func substitutes into, if it is one (see rule());
+        # completion.complete only reasons about rules that have it
+        self.rhs = rhs
+        # label used in instrumentation reports
+        self.name = name if name is not None else repr(lhs)
+        # node type the lhs can match at the root (None: any node)
+        self.head = None if isinstance(lhs, Wildcard) else type(lhs)
+        self._matcher = compile_pattern(lhs)
 
-    def try_apply(self, expr: Expr) -> Optional[Expr]:
-        env = match(self.lhs, expr)
+    def __reduce__(self):
+        # rhs functions are often lambdas/closures: ship those by value
+        return type(self), (self.lhs, _portable(self.rhs_func), self.name, self.rhs)
+
+    def match(self, expr: Expr) -> Match:
+        return self._matcher(expr, {})
+
+    def apply(self, expr: Expr) -> Optional[Expr]:
+        """Rewrite expr at the root only; None if the lhs does not match or rhs_func declines."""
+        env = self._matcher(expr, {})
         if env is not None:
             return self.rhs_func(env)
-        # try deeper
-        if isinstance(expr, Sum):
-            new_terms = []
-            changed = False
-            for t in expr.terms:
-                nt = self.try_apply(t)
-                if nt is not None:
-                    new_terms.append(nt)
-                    changed = True
-                else:
-                    new_terms.append(t)
-            if changed:
-                return Sum(new_terms)
-        if isinstance(expr, Product):
-            new_factors = []
-            changed = False
-            for f in expr.factors:
-                nf = self.try_apply(f)
-                if nf is not None:
-                    new_factors.append(nf)
-                    changed = True
-                else:
-                    new_factors.append(f)
-            if changed:
-                return Product(new_factors)
-        if isinstance(expr, Commutator):
-            na = self.try_apply(expr.a)
-            nb = self.try_apply(expr.b)
-            if na is not None or nb is not None:
-                return Commutator(na or expr.a, nb or expr.b)
-        if isinstance(expr, Coproduct):
-            na = self.try_apply(expr.a)
-            if na is not None:
-                return Coproduct(na)
-        if isinstance(expr, Tensor):
-            nla = self.try_apply(expr.left)
-            nrb = self.try_apply(expr.right)
-            if nla is not None or nrb is not None:
-                return Tensor(nla or expr.left, nrb or expr.right)
         return None
 
+    def try_apply(self, expr: Expr) -> Optional[Expr]:
+        """
+        Rewrite every outermost match of the lhs (the root first, otherwise
+        inside its children); None if nothing matched anywhere. A match the
+        rhs function declines (returns None for) counts as no match.
+        """
+        results: Dict[Expr, Optional[Expr]] = {}
+        stack = [(expr, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded:
+                if node in results:
+                    continue
+                env = self._matcher(node, {})
+                if env is not None:
+                    out = self.rhs_func(env)
+                    if out is not None:
+                        results[node] = out
+                        continue
+                if not isinstance(node, _STRUCTURAL):
+                    results[node] = None
+                    continue
+                stack.append((node, True))
+                stack.extend((c, False) for c in reversed(node.children) if c not in results)
+                continue
+            children = node.children
+            new = [results[c] for c in children]
+            if any(n is not None for n in new):
+                results[node] = node.with_children(
+                    [c if n is None else n for c, n in zip(children, new)])
+            else:
+                results[node] = None
+        return results[expr]
+
+
+# Pickling rule functions by value. Functions that can be imported by name are
+# pickled by reference as usual; lambdas and closures are shipped as bytecode
+# plus closure contents and rebuilt against their module's globals. This only
+# needs to work between processes running the same interpreter (process pools).
+def _importable(fn) -> bool:
+    try:
+        obj = importlib.import_module(fn.__module__)
+        for part in fn.__qualname__.split("."):
+            obj = getattr(obj, part)
+        return obj is fn
+    except Exception:
+        return False
+
+
+class _PortableFunction:
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __reduce__(self):
+        fn = self.fn
+        cells = None
+        if fn.__closure__ is not None:
+            cells = tuple(_portable(c.cell_contents) for c in fn.__closure__)
+        return _load_function, (marshal.dumps(fn.__code__), fn.__module__, fn.__name__,
+                                fn.__defaults__, fn.__kwdefaults__, cells)
+
+
+def _portable(value):
+    if isinstance(value, types.FunctionType) and not _importable(value):
+        return _PortableFunction(value)
+    return value
+
+
+def _load_function(code, module, name, defaults, kwdefaults, cells):
+    globs = importlib.import_module(module).__dict__
+    closure = None if cells is None else tuple(types.CellType(v) for v in cells)
+    fn = types.FunctionType(marshal.loads(code), globs, name, defaults, closure)
+    fn.__kwdefaults__ = kwdefaults
+    return fn
+
+
+class NormalizeResult(NamedTuple):
+    expr: Expr
+    fixpoint: bool  # False if the step budget ran out before a normal form was reached
+    steps: int
+    error: Optional[BaseException] = None  # set by normalize_many when an item failed
+
+
+class RuleStats:
+    """Per-rule counters collected by an instrumented Rewriter."""
+    __slots__ = ("attempts", "fires", "seconds")
+
+    def __init__(self):
+        self.attempts = 0
+        self.fires = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return f"RuleStats(attempts={self.attempts}, fires={self.fires}, seconds={self.seconds:.6f})"
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class _Budget:
+    __slots__ = ("steps", "max_steps")
+
+    def __init__(self, max_steps: Optional[int]):
+        self.steps = 0
+        self.max_steps = max_steps
+
+    @property
+    def exhausted(self) -> bool:
+        return self.max_steps is not None and self.steps >= self.max_steps
+
 
 class Rewriter:
-    def __init__(self, rules: List[RewriteRule]):
+    """Innermost-first normalizer.
+
+    Rules are indexed by the node type of their lhs, so at every node only the
+    rules that can match its head are tried. Children are normalized before
+    their parent; after a rewrite at a node only the freshly built subterms are
+    visited again, everything else is already known to be in normal form.
+
+    Normal forms are remembered across calls in an LRU cache of at most
+    cache_size entries (None: unbounded, 0: disabled). The cache is dropped
+    whenever the rule set changes.
+
+    With collect=True a normal form is returned as a LinComb: like terms are
+    merged (so [a,b] - [a,b] cancels) and the monomials normalized again
+    until collecting changes nothing.
+    """
+
+    def __init__(self, rules: List[RewriteRule], cache_size: Optional[int] = 4096,
+                 collect: bool = False):
+        self.cache_size = cache_size
+        self.collect = collect
+        self._cache: "OrderedDict[Expr, Expr]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
         self.rules = rules
+        # instrumentation, see instrument()
+        self.trace: Optional[Callable[[RewriteRule, Expr, Expr], None]] = None
+        self.rule_stats: Dict[RewriteRule, RuleStats] = {}
+        self.runs = 0
+        self.last_result: Optional[NormalizeResult] = None
+        self._instrumented = False
+
+    @property
+    def rules(self) -> Tuple[RewriteRule, ...]:
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules: List[RewriteRule]):
+        self._rules = tuple(rules)
+        self._index: Dict[type, Tuple[RewriteRule, ...]] = {}
+        self.cache_clear()
+
+    def add_rule(self, rule: RewriteRule):
+        self.rules = self._rules + (rule,)
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.cache_size, len(self._cache))
+
+    def cache_clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_get(self, expr: Expr) -> Optional[Expr]:
+        if self.cache_size == 0:
+            return None
+        out = self._cache.get(expr)
+        if out is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._cache.move_to_end(expr)
+        return out
+
+    def _cache_put(self, expr: Expr, nf: Expr):
+        if self.cache_size == 0:
+            return
+        self._cache[expr] = nf
+        self._cache.move_to_end(expr)
+        if self.cache_size is not None and len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def rules_for(self, head: type) -> Tuple[RewriteRule, ...]:
+        """Rules (in list order) whose lhs can match a node of type head."""
+        found = self._index.get(head)
+        if found is None:
+            found = tuple(r for r in self._rules if r.head is None or r.head is head)
+            self._index[head] = found
+        return found
+
+    def run(self, expr: Expr, max_steps: Optional[int] = 100_000) -> NormalizeResult:
+        """Normalize expr, performing at most max_steps rewrites (None: unbounded)."""
+        budget = _Budget(max_steps)
+        memo: Dict[Expr, Expr] = {}
+        out = self._normalize(expr, memo, budget)
+        if self.collect:
+            out = self._collect(out, memo, budget)
+        result = NormalizeResult(out, not budget.exhausted or self._is_normal(out), budget.steps)
+        if self._instrumented:
+            self.runs += 1
+            self.last_result = result
+        return result
+
+    def _collect(self, expr: Expr, memo: Dict[Expr, Expr], budget: _Budget) -> LinComb:
+        while True:
+            lc = collect(expr)
+            if lc is expr or budget.exhausted:
+                return lc
+            expr = self._normalize(lc, memo, budget)
+            if expr is lc:
+                return lc
+
+    def instrument(self, enabled: bool = True,
+                   trace: Optional[Callable[[RewriteRule, Expr, Expr], None]] = None):
+        """
+        Switch instrumentation on or off. While on, every rule application is
+        counted and timed in rule_stats, run() records runs and last_result,
+        and trace(rule, before, after) is called for each rewrite step.
+        While off, normalization runs the uninstrumented code path.
+        """
+        self._instrumented = enabled
+        self.trace = trace if enabled else None
+        if enabled:
+            self._rewrite_root = self._rewrite_root_instrumented
+        else:
+            self.__dict__.pop("_rewrite_root", None)
+
+    def reset_stats(self):
+        self.rule_stats = {}
+        self.runs = 0
+        self.last_result = None
+
+    def stats_report(self) -> str:
+        lines = [f"{'rule':40s} {'attempts':>10s} {'fires':>10s} {'ms':>10s}"]
+        for r in self._rules:
+            st = self.rule_stats.get(r) or RuleStats()
+            lines.append(f"{r.name[:40]:40s} {st.attempts:10d} {st.fires:10d} {st.seconds * 1e3:10.3f}")
+        if self.last_result is not None:
+            lines.append(f"runs={self.runs} last: steps={self.last_result.steps} "
+                         f"fixpoint={self.last_result.fixpoint}")
+        return "\n".join(lines)
+
+    def normalize(self, expr: Expr, max_iters: Optional[int] = 100_000) -> Expr:
+        """Normal form of expr; max_iters bounds the number of rewrite steps."""
+        return self.run(expr, max_iters).expr
+
+    def normalize_many(self, exprs: List[Expr], workers: Optional[int] = None,
+                       chunksize: Optional[int] = None,
+                       max_steps: Optional[int] = 100_000) -> List[NormalizeResult]:
+        """
+        Normalize independent expressions on a process pool of `workers`
+        processes (None: one per CPU; 0 or 1: in this process).
+
+        The rules are pickled once and installed in every worker; expressions
+        travel in chunks, encoded (without recursion, so at any depth) by
+        serialize.dumps_exprs, which stores their common subterms once. Results come back in
+        input order; an item whose normalization raised gets a NormalizeResult
+        holding the input expression, fixpoint=False and the exception.
+        """
+        exprs = list(exprs)
+        if workers is not None and workers <= 1:
+            return [_normalize_item(self, e, max_steps) for e in exprs]
+
+        from concurrent.futures import ProcessPoolExecutor
+        import os
+
+        from algebra.serialize import dumps_exprs
+
+        workers = workers or os.cpu_count() or 1
+        if chunksize is None:
+            chunksize = max(1, -(-len(exprs) // (workers * 4)))
+        chunks = [exprs[k:k + chunksize] for k in range(0, len(exprs), chunksize)]
+        payload = pickle.dumps((self._rules, self.cache_size, self.collect))
+        results: List[NormalizeResult] = []
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(payload,)) as pool:
+            futures = [pool.submit(_normalize_chunk, dumps_exprs(chunk), max_steps) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                try:
+                    results.extend(_decode_results(*future.result()))
+                except Exception as exc:
+                    results.extend(NormalizeResult(e, False, 0, exc) for e in chunk)
+        return results
+
+    def _rewrite_root(self, node: Expr) -> Optional[Expr]:
+        for r in self.rules_for(type(node)):
+            out = r.apply(node)
+            if out is not None and out is not node:
+                return out
+        return None
+
+    def _rewrite_root_instrumented(self, node: Expr) -> Optional[Expr]:
+        for r in self.rules_for(type(node)):
+            st = self.rule_stats.get(r)
+            if st is None:
+                st = self.rule_stats[r] = RuleStats()
+            start = perf_counter()
+            out = r.apply(node)
+            st.seconds += perf_counter() - start
+            st.attempts += 1
+            if out is not None and out is not node:
+                st.fires += 1
+                if self.trace is not None:
+                    self.trace(r, node, out)
+                return out
+        return None
+
+    def _lookup(self, expr: Expr, memo: Dict[Expr, Expr]) -> Optional[Expr]:
+        done = memo.get(expr)
+        if done is None:
+            done = self._cache_get(expr)
+            if done is not None:
+                memo[expr] = done
+        return done
+
+    def _normalize(self, expr: Expr, memo: Dict[Expr, Expr], budget: _Budget) -> Expr:
+        done = self._lookup(expr, memo)
+        if done is not None:
+            return done
+        # Each frame is [original subterm, its current rewrite]. A frame waits
+        # until its children are normalized, then rewrites at its root and, if
+        # a rule fired, carries on with the result. Once the budget is spent the
+        # remaining frames only rebuild from what is known (kept in `partial`).
+        partial: Dict[Expr, Expr] = {}
+        stack = [[expr, expr]]
+        while stack:
+            frame = stack[-1]
+            orig, node = frame
+            if orig in memo or orig in partial:
+                stack.pop()
+                continue
+            children = node.children
+            if children and not budget.exhausted:
+                pending = [c for c in children if c not in partial and self._lookup(c, memo) is None]
+                if pending:
+                    stack.extend([c, c] for c in reversed(pending))
+                    continue
+            if children:
+                new = []
+                for c in children:
+                    n = memo.get(c)
+                    new.append(n if n is not None else partial.get(c, c))
+                if any(n is not c for n, c in zip(new, children)):
+                    node = frame[1] = node.with_children(new)
+            if not budget.exhausted:
+                out = self._rewrite_root(node)
+                if out is not None:
+                    budget.steps += 1
+                    known = self._lookup(out, memo)
+                    if known is None:
+                        frame[1] = out
+                        continue
+                    node = known
+                stack.pop()
+                memo[orig] = node
+                memo[node] = node
+                self._cache_put(orig, node)
+            else:
+                stack.pop()
+                partial[orig] = node
+        done = memo.get(expr)
+        return done if done is not None else partial[expr]
+
+    def _is_normal(self, expr: Expr) -> bool:
+        stack = [expr]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if Rewriter._rewrite_root(self, node) is not None:
+                return False
+            stack.extend(node.children)
+        return True
 
-    def normalize(self, expr: Expr, max_iters=100) -> Expr:
-        current = expr
-        for i in range(max_iters):
-            changed = False
-            for r in self.rules:
-                res = r.try_apply(current)
-                if res is not None and res != current:
-                    current = res
-                    changed = True
-                    break
-            if not changed:
-                return current
-        return current
+
+def _normalize_item(rewriter: Rewriter, expr: Expr, max_steps: Optional[int]) -> NormalizeResult:
+    try:
+        return rewriter.run(expr, max_steps)
+    except Exception as exc:
+        return NormalizeResult(expr, False, 0, exc)
+
+
+_worker_rewriter: Optional[Rewriter] = None
+
+
+def _init_worker(payload: bytes):
+    global _worker_rewriter
+    rules, cache_size, collect_terms = pickle.loads(payload)
+    _worker_rewriter = Rewriter(rules, cache_size, collect_terms)
+
+
+def _normalize_chunk(data: bytes, max_steps: Optional[int]) -> Tuple[bytes, list]:
+    """Normalize an encoded chunk; the results come back as encoded expressions plus their status."""
+    from algebra.serialize import dumps_exprs, loads_exprs
+
+    out = []
+    for expr in loads_exprs(data):
+        res = _normalize_item(_worker_rewriter, expr, max_steps)
+        if res.error is not None:
+            try:
+                pickle.dumps(res.error)
+            except Exception:
+                res = res._replace(error=RuntimeError(repr(res.error)))
+        out.append(res)
+    return dumps_exprs([res.expr for res in out]), [(res.fixpoint, res.steps, res.error) for res in out]
+
+
+def _decode_results(data: bytes, status: list) -> List[NormalizeResult]:
+    from algebra.serialize import loads_exprs
+
+    return [NormalizeResult(expr, *st) for expr, st in zip(loads_exprs(data), status)]
 
 
 # Useful helpers to build rules more easily
-def rule(lhs: Expr, rhs: Expr) -> RewriteRule:
-    return RewriteRule(lhs, lambda env: substitute(rhs, env))
+def rule(lhs: Expr, rhs: Expr, name: Optional[str] = None) -> RewriteRule:
+    return RewriteRule(lhs, lambda env: substitute(rhs, env), name, rhs=rhs)
 
 
 def substitute(expr: Expr, env: Dict[str, Expr]) -> Expr:
-    if isinstance(expr, Wildcard):
-        return env[expr.name]
-    if isinstance(expr, Atom):
-        return expr
-    if isinstance(expr, Sum):
-        return Sum([substitute(t, env) for t in expr.terms])
-    if isinstance(expr, Product):
-        return Product([substitute(f, env) for f in expr.factors])
-    if isinstance(expr, Commutator):
-        return Commutator(substitute(expr.a, env), substitute(expr.b, env))
-    if isinstance(expr, Coproduct):
-        return Coproduct(substitute(expr.a, env))
-    if isinstance(expr, Tensor):
-        return Tensor(substitute(expr.left, env), substitute(expr.right, env))
-    return expr
+    done: Dict[Expr, Expr] = {}
+    stack = [expr]
+    while stack:
+        node = stack[-1]
+        if node in done:
+            stack.pop()
+            continue
+        if isinstance(node, (Wildcard, SeqWildcard)):
+            done[node] = env[node.name]
+            stack.pop()
+            continue
+        if not isinstance(node, _STRUCTURAL):
+            done[node] = node
+            stack.pop()
+            continue
+        pending = [c for c in node.children if c not in done]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        if isinstance(node, Sum):
+            # sequence wildcards splice their terms into the enclosing Sum
+            terms = []
+            for c in node.terms:
+                if isinstance(c, SeqWildcard):
+                    terms.extend(done[c].terms)
+                else:
+                    terms.append(done[c])
+            done[node] = Sum(terms)
+        else:
+            done[node] = node.with_children([done[c] for c in node.children])
+    return done[expr]
 
 
 # Simple algebraic helpers
 A = lambda name: Atom(name)
 W = lambda name: Wildcard(name)
+S = lambda name: SeqWildcard(name)
 
 
 # Example: define commutator linearity and antisymmetry
@@ -253,23 +1427,25 @@ def antisymmetry_rule():
 
     def rhs(env):
         a, b = env["x"], env["y"]
-        # enforce canonical ordering: only flip if repr(a) > repr(b)
-        if repr(a) > repr(b):
+        # enforce canonical ordering: only flip if a > b structurally
+        if sort_key(a) > sort_key(b):
             return Product([Atom("-1"), Commutator(b, a)])
         return Commutator(a, b)
 
-    return RewriteRule(Commutator(x, y), rhs)
+    return RewriteRule(Commutator(x, y), rhs, name="antisymmetry")
 
 
 default_rules = [
-    # linearity first
+    # linearity first, over sums of any length in one step
     RewriteRule(
-        Commutator(W("x"), Sum([W("y"), W("z")])),
-        lambda env: Sum([Commutator(env["x"], env["y"]), Commutator(env["x"], env["z"])])
+        Commutator(W("x"), Sum([S("ys")])),
+        lambda env: Sum([Commutator(env["x"], y) for y in env["ys"].terms]),
+        name="linearity-right",
     ),
     RewriteRule(
-        Commutator(Sum([W("x"), W("y")]), W("z")),
-        lambda env: Sum([Commutator(env["x"], env["z"]), Commutator(env["y"], env["z"])])
+        Commutator(Sum([S("xs")]), W("z")),
+        lambda env: Sum([Commutator(x, env["z"]) for x in env["xs"].terms]),
+        name="linearity-left",
     ),
     antisymmetry_rule(),
 ]
@@ -0,0 +1,380 @@
+"""
+Compact binary files for expressions and commutation tables, plus an
+on-disk cache addressed by the hash of what was computed.
+
+Expression files ("YGXE") hold a string table and a node table. Every
+distinct (interned) subterm is stored once, as a type tag plus integer
+references to strings or to earlier nodes, so a file is a DAG in post-order.
+Relation table files ("YGXT") hold fixed-size sorted keys and variable-size
+relation records. Both are read through mmap and decode only what is asked
+for: one root expression, or one [T_a, T_b] relation.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from fractions import Fraction
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from algebra.rewrite import (Atom, Commutator, Coproduct, Expr, LinComb, MultiTensor, Product,
+                             SeqWildcard, Sum, Tensor, Wildcard)
+
+FORMAT_VERSION = 1
+
+_EXPR_MAGIC = b"YGXE"
+_TABLE_MAGIC = b"YGXT"
+# magic, version, n_strings, n_nodes, n_roots, string index offset, node index offset, roots offset
+_EXPR_HEADER = struct.Struct("<4sHIIIQQQ")
+# magic, version, n_entries, keys offset
+_TABLE_HEADER = struct.Struct("<4sHIQ")
+_TABLE_KEY = struct.Struct("<6iQ")  # (i, j, r, k, l, s), record offset
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+_TAGS = [Atom, Wildcard, Sum, Product, Commutator, Coproduct, Tensor, MultiTensor, LinComb, SeqWildcard]
+_TAG_OF = {cls: tag for tag, cls in enumerate(_TAGS)}
+_NAMED = (Atom, Wildcard, SeqWildcard)
+_VARIADIC = (Sum, Product, MultiTensor)
+
+
+class FormatError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------- expressions
+
+def dumps_exprs(exprs: Iterable[Expr]) -> bytes:
+    exprs = list(exprs)
+    strings: Dict[str, int] = {}
+    ids: Dict[Expr, int] = {}
+    records: List[bytes] = []
+
+    def string_id(s: str) -> int:
+        k = strings.get(s)
+        if k is None:
+            k = strings[s] = len(strings)
+        return k
+
+    # iterative post-order: children get smaller ids than their parents
+    for root in exprs:
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            if node in ids:
+                stack.pop()
+                continue
+            pending = [c for c in node.children if c not in ids]
+            if pending:
+                stack.extend(reversed(pending))
+                continue
+            stack.pop()
+            cls = type(node)
+            tag = _TAG_OF.get(cls)
+            if tag is None:
+                raise TypeError(f"cannot serialize {cls.__name__}")
+            if cls in _NAMED:
+                body = struct.pack("<BI", tag, string_id(node.name))
+            elif cls is LinComb:
+                refs = []
+                for m, c in node.items:
+                    refs += [ids[m], string_id(str(c))]
+                body = struct.pack(f"<BI{len(refs)}I", tag, len(node.items), *refs)
+            elif cls in _VARIADIC:
+                children = [ids[c] for c in node.children]
+                body = struct.pack(f"<BI{len(children)}I", tag, len(children), *children)
+            else:
+                children = [ids[c] for c in node.children]
+                body = struct.pack(f"<B{len(children)}I", tag, *children)
+            ids[node] = len(records)
+            records.append(body)
+
+    out = bytearray(_EXPR_HEADER.size)
+    string_offsets = []
+    for s in strings:
+        data = s.encode("utf-8")
+        string_offsets.append(len(out))
+        out += _U32.pack(len(data)) + data
+    string_index = len(out)
+    for off in string_offsets:
+        out += _U64.pack(off)
+    node_offsets = []
+    for body in records:
+        node_offsets.append(len(out))
+        out += body
+    node_index = len(out)
+    for off in node_offsets:
+        out += _U64.pack(off)
+    roots = len(out)
+    for root in exprs:
+        out += _U32.pack(ids[root])
+    _EXPR_HEADER.pack_into(out, 0, _EXPR_MAGIC, FORMAT_VERSION, len(strings), len(records),
+                           len(exprs), string_index, node_index, roots)
+    return bytes(out)
+
+
+class ExprReader:
+    """Random access to the root expressions of a YGXE buffer; nodes are decoded on demand."""
+
+    def __init__(self, buffer):
+        self._buf = buffer
+        magic, version, self._n_strings, self._n_nodes, self._n_roots, \
+            self._string_index, self._node_index, self._roots = _EXPR_HEADER.unpack_from(buffer, 0)
+        if magic != _EXPR_MAGIC or version != FORMAT_VERSION:
+            raise FormatError("not a version %d expression file" % FORMAT_VERSION)
+        self._strings: Dict[int, str] = {}
+        self._nodes: Dict[int, Expr] = {}
+
+    def __len__(self):
+        return self._n_roots
+
+    def __getitem__(self, k: int) -> Expr:
+        if not -self._n_roots <= k < self._n_roots:
+            raise IndexError(k)
+        k %= self._n_roots
+        node_id, = _U32.unpack_from(self._buf, self._roots + 4 * k)
+        return self._node(node_id)
+
+    def __iter__(self):
+        return (self[k] for k in range(self._n_roots))
+
+    def _string(self, k: int) -> str:
+        s = self._strings.get(k)
+        if s is None:
+            off, = _U64.unpack_from(self._buf, self._string_index + 8 * k)
+            length, = _U32.unpack_from(self._buf, off)
+            s = self._strings[k] = bytes(self._buf[off + 4:off + 4 + length]).decode("utf-8")
+        return s
+
+    def _record(self, node_id: int):
+        off, = _U64.unpack_from(self._buf, self._node_index + 8 * node_id)
+        tag = self._buf[off]
+        cls = _TAGS[tag]
+        off += 1
+        if cls in _NAMED:
+            return cls, _U32.unpack_from(self._buf, off)
+        if cls is LinComb or cls in _VARIADIC:
+            count, = _U32.unpack_from(self._buf, off)
+            width = 2 * count if cls is LinComb else count
+            return cls, struct.unpack_from(f"<{width}I", self._buf, off + 4)
+        arity = 1 if cls is Coproduct else 2
+        return cls, struct.unpack_from(f"<{arity}I", self._buf, off)
+
+    def _node(self, node_id: int) -> Expr:
+        done = self._nodes.get(node_id)
+        if done is not None:
+            return done
+        stack = [node_id]
+        while stack:
+            k = stack[-1]
+            if k in self._nodes:
+                stack.pop()
+                continue
+            cls, refs = self._record(k)
+            if cls in _NAMED:
+                self._nodes[k] = cls(self._string(refs[0]))
+                stack.pop()
+                continue
+            child_refs = refs[0::2] if cls is LinComb else refs
+            pending = [c for c in child_refs if c not in self._nodes]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if cls is LinComb:
+                self._nodes[k] = LinComb._make({self._nodes[m]: Fraction(self._string(c))
+                                                for m, c in zip(refs[0::2], refs[1::2])})
+            elif cls in _VARIADIC:
+                self._nodes[k] = cls([self._nodes[c] for c in refs])
+            else:
+                self._nodes[k] = cls(*(self._nodes[c] for c in refs))
+        return self._nodes[node_id]
+
+
+def loads_exprs(data: bytes) -> List[Expr]:
+    return list(ExprReader(data))
+
+
+def dump_exprs(exprs: Iterable[Expr], path: str):
+    _atomic_write(path, dumps_exprs(exprs))
+
+
+class _MappedFile:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ExprFile(_MappedFile, ExprReader):
+    """Memory-mapped expression file; see ExprReader."""
+
+    def __init__(self, path: str):
+        _MappedFile.__init__(self, path)
+        ExprReader.__init__(self, self._mmap)
+
+
+# ---------------------------------------------------------------- relation tables
+
+def dumps_table(table) -> bytes:
+    """Serialize a {((i,j,r), (k,l,s)): {monomial: int}} table, e.g. relations.rtt_commutation_table."""
+    keys = sorted(table)
+    out = bytearray(_TABLE_HEADER.size + _TABLE_KEY.size * len(keys))
+    for n, key in enumerate(keys):
+        relation = table[key]
+        _TABLE_KEY.pack_into(out, _TABLE_HEADER.size + _TABLE_KEY.size * n, *key[0], *key[1], len(out))
+        out += _U32.pack(len(relation))
+        for monomial, c in relation.items():
+            out += struct.pack("<qI", c, len(monomial))
+            for g in monomial:
+                out += struct.pack("<3i", *g)
+    _TABLE_HEADER.pack_into(out, 0, _TABLE_MAGIC, FORMAT_VERSION, len(keys), _TABLE_HEADER.size)
+    return bytes(out)
+
+
+class TableReader:
+    """Mapping view of a YGXT buffer: a relation is decoded only when it is looked up."""
+
+    def __init__(self, buffer):
+        self._buf = buffer
+        magic, version, self._n, self._keys = _TABLE_HEADER.unpack_from(buffer, 0)
+        if magic != _TABLE_MAGIC or version != FORMAT_VERSION:
+            raise FormatError("not a version %d table file" % FORMAT_VERSION)
+
+    def __len__(self):
+        return self._n
+
+    def _entry(self, k: int):
+        fields = _TABLE_KEY.unpack_from(self._buf, self._keys + _TABLE_KEY.size * k)
+        return (tuple(fields[:3]), tuple(fields[3:6])), fields[6]
+
+    def _relation(self, off: int):
+        count, = _U32.unpack_from(self._buf, off)
+        off += 4
+        relation = {}
+        for _ in range(count):
+            c, degree = struct.unpack_from("<qI", self._buf, off)
+            off += 12
+            flat = struct.unpack_from(f"<{3 * degree}i", self._buf, off)
+            off += 12 * degree
+            relation[tuple(flat[3 * a:3 * a + 3] for a in range(degree))] = c
+        return relation
+
+    def get(self, key, default=None):
+        key = (tuple(key[0]), tuple(key[1]))
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found, off = self._entry(mid)
+            if found == key:
+                return self._relation(off)
+            if found < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return default
+
+    def __getitem__(self, key):
+        out = self.get(key)
+        if out is None:
+            raise KeyError(key)
+        return out
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self):
+        return (self._entry(k)[0] for k in range(self._n))
+
+    def __iter__(self):
+        return self.keys()
+
+    def items(self):
+        for k in range(self._n):
+            key, off = self._entry(k)
+            yield key, self._relation(off)
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+def dump_table(table, path: str):
+    _atomic_write(path, dumps_table(table))
+
+
+class TableFile(_MappedFile, TableReader):
+    """Memory-mapped relation table; see TableReader."""
+
+    def __init__(self, path: str):
+        _MappedFile.__init__(self, path)
+        TableReader.__init__(self, self._mmap)
+
+
+# ---------------------------------------------------------------- disk cache
+
+def _atomic_write(path: str, data: bytes):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class DiskCache:
+    """
+    Files named by the SHA-256 of the parameters that determine their content.
+
+    The default location is $YANGIAN_CACHE_DIR, else ~/.cache/yangian-playground.
+    Entries are written atomically, so concurrent workers can share a cache.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        if root is None:
+            root = os.environ.get("YANGIAN_CACHE_DIR") or os.path.join(
+                os.path.expanduser("~"), ".cache", "yangian-playground")
+        self.root = root
+
+    def path_for(self, *parts, suffix: str = ".bin") -> str:
+        digest = hashlib.sha256(repr((FORMAT_VERSION,) + parts).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], digest + suffix)
+
+    def get_or_create(self, parts: Tuple, build: Callable[[], bytes], suffix: str = ".bin") -> str:
+        """Path of the entry for parts, calling build() for its bytes on a miss."""
+        path = self.path_for(*parts, suffix=suffix)
+        if not os.path.exists(path):
+            _atomic_write(path, build())
+        return path
+
+
+def cached_commutation_table(n: int = 2, max_order: int = 2,
+                             cache: Optional[DiskCache] = None) -> TableFile:
+    """relations.rtt_commutation_table(n, max_order), computed once per cache and memory-mapped."""
+    from algebra.relations import rtt_commutation_table
+
+    cache = cache or DiskCache()
+    path = cache.get_or_create(("rtt_commutation_table", n, max_order),
+                               lambda: dumps_table(rtt_commutation_table(n, max_order)), ".ygxt")
+    return TableFile(path)
+
+
+def cached_exprs(parts: Tuple, compute: Callable[[], Iterable[Expr]],
+                 cache: Optional[DiskCache] = None) -> ExprFile:
+    """Expressions computed by compute(), stored under the key parts and memory-mapped."""
+    cache = cache or DiskCache()
+    path = cache.get_or_create(tuple(parts), lambda: dumps_exprs(compute()), ".ygxe")
+    return ExprFile(path)
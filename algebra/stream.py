@@ -0,0 +1,77 @@
+"""
+Lazy term pipelines.
+
+A term stream is an iterator of (monomial, coeff) pairs. Expansions yield
+terms one at a time and the stages below aggregate them in bounded chunks,
+so peak memory depends on the chunk size rather than on the size of the
+expansion. Only to_lincomb materializes the whole result.
+"""
+from fractions import Fraction
+from itertools import islice, product
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from algebra.rewrite import (Expr, LinComb, MultiTensor, ONE, Product, Sum, Tensor, collect)
+
+Term = Tuple[Expr, Fraction]
+
+
+def _combine(expr: Expr, monomials) -> Expr:
+    if isinstance(expr, Product):
+        factors = [m for m in monomials if m is not ONE]
+        if not factors:
+            return ONE
+        return factors[0] if len(factors) == 1 else Product(factors)
+    return expr.with_children(monomials)
+
+
+def iter_terms(expr: Expr) -> Iterator[Term]:
+    """Terms of collect(expr), yielded lazily; like terms are not merged."""
+    if isinstance(expr, LinComb):
+        yield from expr.items
+    elif isinstance(expr, Sum):
+        for t in expr.terms:
+            yield from iter_terms(t)
+    elif isinstance(expr, (Product, Tensor, MultiTensor)):
+        factors = [collect(f).items for f in expr.children]
+        for combo in product(*factors):
+            c = Fraction(1)
+            for _, d in combo:
+                c *= d
+            yield _combine(expr, [m for m, _ in combo]), c
+    else:
+        yield from collect(expr).items
+
+
+def chunked(terms: Iterable[Term], size: int) -> Iterator[List[Term]]:
+    it = iter(terms)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def drop_zeros(terms: Iterable[Term]) -> Iterator[Term]:
+    return ((m, c) for m, c in terms if c != 0)
+
+
+def collect_chunks(terms: Iterable[Term], chunk_size: int = 10_000) -> Iterator[Term]:
+    """Merge like terms within each chunk of chunk_size input terms; zeros are dropped."""
+    for chunk in chunked(terms, chunk_size):
+        coeffs: Dict[Expr, Fraction] = {}
+        for m, c in chunk:
+            coeffs[m] = coeffs.get(m, 0) + c
+        yield from drop_zeros(coeffs.items())
+
+
+def write_terms(terms: Iterable[Term], sink: Callable[[Expr, Fraction], None]) -> int:
+    """Pass every term to sink(monomial, coeff); returns the number of terms written."""
+    count = 0
+    for m, c in terms:
+        sink(m, c)
+        count += 1
+    return count
+
+
+def to_lincomb(terms: Iterable[Term]) -> LinComb:
+    return LinComb(terms)
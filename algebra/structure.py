@@ -0,0 +1,146 @@
+"""
+Precomputed structure constants of the gl(n) Yangian.
+
+The generators T_ij^(r) are numbered gid = ((r-1)*n + (i-1))*n + (j-1), so
+keys and ids convert in O(1) both ways and levels above max_level (which
+occur on the right-hand sides) still have ids. For 1 <= r, s <= max_level,
+
+    [T_a, T_b] = sum_m c_ab^m T_m
+
+over ordered monomials m (products of one or two generators). The table is
+CSR over the pair row a*N + b, N = n*n*max_level: columns are monomial ids,
+coefficients are exact rationals stored as int64 numerator/denominator
+arrays, and monomials are themselves CSR rows of generator ids.
+"""
+import io
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .relations import GeneratorKey, Relation, commutator_relation
+
+_ARRAYS = ("indptr", "cols", "num", "den", "mono_indptr", "mono_gens")
+
+
+class StructureConstants:
+    def __init__(self, n: int, max_level: int, indptr, cols, num, den, mono_indptr, mono_gens):
+        self.n = n
+        self.max_level = max_level
+        self.size = n * n * max_level
+        self.indptr = indptr
+        self.cols = cols
+        self.num = num
+        self.den = den
+        self.mono_indptr = mono_indptr
+        self.mono_gens = mono_gens
+        self._monomials: Optional[List[Tuple[int, ...]]] = None
+
+    @classmethod
+    def build(cls, n: int = 2, max_level: int = 2) -> "StructureConstants":
+        """Derive the table from relations.commutator_relation (no sympy involved)."""
+        size = n * n * max_level
+        mono_ids: Dict[Tuple[int, ...], int] = {}
+        mono_indptr, mono_gens = [0], []
+        indptr, cols, num, den = [0], [], [], []
+
+        def gid(i, j, r):
+            return ((r - 1) * n + (i - 1)) * n + (j - 1)
+
+        for a in range(size):
+            g = _key(n, a)
+            for b in range(size):
+                row = sorted(commutator_relation(*g, *_key(n, b)).items())
+                for monomial, c in row:
+                    ids = tuple(gid(*h) for h in monomial)
+                    m = mono_ids.get(ids)
+                    if m is None:
+                        m = mono_ids[ids] = len(mono_ids)
+                        mono_gens.extend(ids)
+                        mono_indptr.append(len(mono_gens))
+                    c = Fraction(c)
+                    cols.append(m)
+                    num.append(c.numerator)
+                    den.append(c.denominator)
+                indptr.append(len(cols))
+        return cls(n, max_level,
+                   np.array(indptr, dtype=np.int64), np.array(cols, dtype=np.int32),
+                   np.array(num, dtype=np.int64), np.array(den, dtype=np.int64),
+                   np.array(mono_indptr, dtype=np.int64), np.array(mono_gens, dtype=np.int32))
+
+    def gid(self, key: GeneratorKey) -> int:
+        i, j, r = key
+        return ((r - 1) * self.n + (i - 1)) * self.n + (j - 1)
+
+    def key(self, gid: int) -> GeneratorKey:
+        return _key(self.n, gid)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.cols)
+
+    def monomial(self, m: int) -> Tuple[int, ...]:
+        """Generator ids of monomial m, in order."""
+        if self._monomials is None:
+            ptr, gens = self.mono_indptr.tolist(), self.mono_gens.tolist()
+            self._monomials = [tuple(gens[ptr[k]:ptr[k + 1]]) for k in range(len(ptr) - 1)]
+        return self._monomials[m]
+
+    def commutator(self, a: int, b: int) -> List[Tuple[Tuple[int, ...], Fraction]]:
+        """[T_a, T_b] by generator ids, as [(monomial ids, coefficient)]."""
+        if not (0 <= a < self.size and 0 <= b < self.size):
+            raise KeyError(f"generator ids ({a}, {b}) outside levels 1..{self.max_level}")
+        row = a * self.size + b
+        start, stop = int(self.indptr[row]), int(self.indptr[row + 1])
+        return [(self.monomial(int(m)), Fraction(int(p), int(q)))
+                for m, p, q in zip(self.cols[start:stop], self.num[start:stop], self.den[start:stop])]
+
+    def relation(self, g: GeneratorKey, h: GeneratorKey) -> Relation:
+        """[T_g, T_h] keyed like relations.commutator_relation, with Fraction coefficients."""
+        return {tuple(self.key(x) for x in ids): c for ids, c in self.commutator(self.gid(g), self.gid(h))}
+
+    def __getitem__(self, pair: Tuple[GeneratorKey, GeneratorKey]) -> Relation:
+        return self.relation(*pair)
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez(buf, shape=np.array([self.n, self.max_level], dtype=np.int64),
+                 **{name: getattr(self, name) for name in _ARRAYS})
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "StructureConstants":
+        return cls._from_npz(np.load(io.BytesIO(data), allow_pickle=False))
+
+    def save(self, path: str):
+        with open(path, "wb") as fh:
+            fh.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "StructureConstants":
+        with open(path, "rb") as fh:
+            return cls._from_npz(np.load(fh, allow_pickle=False))
+
+    @classmethod
+    def _from_npz(cls, npz) -> "StructureConstants":
+        n, max_level = (int(x) for x in npz["shape"])
+        return cls(n, max_level, *(npz[name] for name in _ARRAYS))
+
+    def __repr__(self):
+        return f"StructureConstants(n={self.n}, max_level={self.max_level}, nnz={self.nnz})"
+
+
+def _key(n: int, gid: int) -> GeneratorKey:
+    rest, j = divmod(gid, n)
+    r, i = divmod(rest, n)
+    return i + 1, j + 1, r + 1
+
+
+def cached_structure_constants(n: int = 2, max_level: int = 2, cache=None) -> StructureConstants:
+    """StructureConstants.build(n, max_level), computed once per serialize.DiskCache."""
+    from .serialize import DiskCache
+
+    cache = cache or DiskCache()
+    path = cache.get_or_create(("structure_constants", n, max_level),
+                               lambda: StructureConstants.build(n, max_level).to_bytes(), ".npz")
+    return StructureConstants.load(path)
@@ -1,14 +1,155 @@
+import operator
+
 from .generator import T
-import sympy as sp
 
 
-def T_matrix(z, max_order=2):
-    Tmat = sp.Matrix(2, 2, lambda i, j: 0)
-    for i in range(2):
-        for j in range(2):
+def T_matrix(z, max_order=2, n=2):
+    import sympy as sp
+    Tmat = sp.Matrix(n, n, lambda i, j: 0)
+    for i in range(n):
+        for j in range(n):
             entry = 0
             for r in range(1, max_order + 1):
                 Tijr = T(i+1, j+1, r)
                 entry += Tijr / z**r
             Tmat[i, j] = entry
     return Tmat
+
+
+class TSeries:
+    """
+    Truncated formal series sum_{r=0}^{order} C^(r) u^-r with matrix coefficients.
+
+    Coefficients are kept sparse as levels {(i, j): value} (1-based indices,
+    as in generator.T) and are computed on demand from a source, a function
+    r -> level. Products and Kronecker products convolve the levels of their
+    factors, so raising the truncation with extend() only computes the new
+    orders. Entries may be anything supporting + and the chosen mul (sympy
+    expressions by default), and their products keep the factor order.
+    """
+
+    def __init__(self, shape, source, order):
+        self.shape = shape
+        self.order = order
+        self._source = source
+        self._levels = []
+
+    @classmethod
+    def generators(cls, n=2, order=2, unit=True):
+        """T(u) = I + sum_r T^(r) u^-r with T^(r)_ij = T(i, j, r); unit=False drops the I."""
+        def source(r):
+            if r == 0:
+                return {(i, i): 1 for i in range(1, n + 1)} if unit else {}
+            return {(i, j): T(i, j, r) for i in range(1, n + 1) for j in range(1, n + 1)}
+        return cls((n, n), source, order)
+
+    @classmethod
+    def identity(cls, n=2, order=0):
+        return cls((n, n), lambda r: {(i, i): 1 for i in range(1, n + 1)} if r == 0 else {}, order)
+
+    @classmethod
+    def from_coefficients(cls, shape, coeffs, order=None):
+        """Polynomial in u^-1 from {(i, j, r): value}; order defaults to the highest r."""
+        levels = {}
+        for (i, j, r), value in coeffs.items():
+            if value != 0:
+                levels.setdefault(r, {})[i, j] = value
+        if order is None:
+            order = max(levels, default=0)
+        return cls(shape, lambda r: levels.get(r, {}), order)
+
+    def _level(self, r):
+        # ignores the truncation: products need their factors past it when extended
+        while len(self._levels) <= r:
+            self._levels.append(self._source(len(self._levels)))
+        return self._levels[r]
+
+    def level(self, r):
+        """C^(r) as {(i, j): value} without zero entries; {} past the truncation."""
+        if r < 0 or r > self.order:
+            return {}
+        return self._level(r)
+
+    def __getitem__(self, key):
+        i, j, r = key
+        return self.level(r).get((i, j), 0)
+
+    def items(self):
+        """Yield ((i, j, r), value) for the nonzero coefficients up to the truncation."""
+        for r in range(self.order + 1):
+            for (i, j), value in sorted(self.level(r).items()):
+                yield (i, j, r), value
+
+    def extend(self, order):
+        """Raise the truncation to order (in place); returns self."""
+        self.order = max(self.order, order)
+        return self
+
+    def truncate(self, order):
+        return TSeries(self.shape, self._level, min(self.order, order))
+
+    def __add__(self, other):
+        if self.shape != other.shape:
+            raise ValueError(f"shape mismatch: {self.shape} and {other.shape}")
+
+        def source(r):
+            out = dict(self._level(r))
+            for key, value in other._level(r).items():
+                out[key] = out[key] + value if key in out else value
+            return {key: value for key, value in out.items() if value != 0}
+        return TSeries(self.shape, source, min(self.order, other.order))
+
+    def matmul(self, other, mul=operator.mul):
+        """Matrix product, (AB)^(r)_ij = sum_{p+q=r} sum_k mul(A^(p)_ik, B^(q)_kj)."""
+        if self.shape[1] != other.shape[0]:
+            raise ValueError(f"shape mismatch: {self.shape} and {other.shape}")
+
+        def source(r):
+            out = {}
+            for p in range(r + 1):
+                rows = {}
+                for (k, j), b in other._level(r - p).items():
+                    rows.setdefault(k, []).append((j, b))
+                if not rows:
+                    continue
+                for (i, k), a in self._level(p).items():
+                    for j, b in rows.get(k, ()):
+                        value = mul(a, b)
+                        out[i, j] = out[i, j] + value if (i, j) in out else value
+            return {key: value for key, value in out.items() if value != 0}
+        return TSeries((self.shape[0], other.shape[1]), source, min(self.order, other.order))
+
+    __mul__ = matmul
+
+    def kron(self, other, mul=operator.mul):
+        """
+        Kronecker product in the same variable, (A ⊗ B)^(r) = sum_{p+q=r} A^(p) ⊗ B^(q).
+        Row (i, k) of the result has index (i-1)*m + k for B with m rows, likewise columns.
+        """
+        m, m2 = other.shape
+
+        def source(r):
+            out = {}
+            for p in range(r + 1):
+                right = other._level(r - p)
+                if not right:
+                    continue
+                for (i, j), a in self._level(p).items():
+                    for (k, l), b in right.items():
+                        key = ((i - 1) * m + k, (j - 1) * m2 + l)
+                        value = mul(a, b)
+                        out[key] = out[key] + value if key in out else value
+            return {key: value for key, value in out.items() if value != 0}
+        shape = (self.shape[0] * m, self.shape[1] * m2)
+        return TSeries(shape, source, min(self.order, other.order))
+
+    def to_matrix(self, z):
+        """The sympy Matrix sum_r C^(r) z^-r, truncated."""
+        import sympy as sp
+        M = sp.zeros(*self.shape)
+        for (i, j, r), value in self.items():
+            M[i - 1, j - 1] += value / z**r
+        return M
+
+    def __repr__(self):
+        return f"TSeries(shape={self.shape}, order={self.order})"
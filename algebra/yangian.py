@@ -1,4 +1,9 @@
-from algebra.rewrite import Atom, Sum, Tensor, Coproduct, A
+from fractions import Fraction
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from algebra.rewrite import Expr, Atom, Sum, Tensor, MultiTensor, Coproduct, LinComb, A, ONE, collect, sort_key
+from algebra.stream import iter_terms, to_lincomb
 
 
 def parse_generator_name(name: str):
@@ -15,135 +20,259 @@ def parse_generator_name(name: str):
         return None
 
 
-def coproduct_expand(atom: Atom):
+class GeneratorKey(NamedTuple):
+    typ: str  # 'E' / 'F' / 'H', or 'T' with index 10*i + j for T_ij
+    index: int
+    level: int
+
+    @property
+    def name(self):
+        return f"{self.typ}{self.index}_{self.level}"
+
+
+@lru_cache(maxsize=None)
+def generator_key(name: str) -> Optional[GeneratorKey]:
+    """parse_generator_name with integer index/level, parsed once per name."""
+    parsed = parse_generator_name(name)
+    if parsed is None:
+        return None
+    typ, idx, level = parsed
+    try:
+        return GeneratorKey(typ, int(idx), int(level))
+    except ValueError:
+        return None
+
+
+def t_generator(i: int, j: int, r: int) -> Optional[Atom]:
     """
-    Expand Δ for 1, and for generators E_i, F_i, H_i at levels 0/1/2.
-    Always returns a Tensor or a Sum of Tensors (never a symbolic Coproduct)
-    so tests can see '⊗' in repr().
+    T_ij^(r) as the atom 'Tij_r' (i, j single digits). T^(0) is the identity:
+    T_ii^(0) is 1 and T_ij^(0) for i != j is None (zero).
     """
-    name = atom.name
+    if r == 0:
+        return ONE if i == j else None
+    return Atom(f"T{i}{j}_{r}")
+
+
+@lru_cache(maxsize=None)
+def rtt_coproduct_terms(i: int, j: int, r: int, n: int = 2) -> tuple:
+    """
+    Δ(T_ij^(r)) in gl(n) as (left, right, coeff) terms, read off level by
+    level from Δ(T(u)) = T(u) ⊗ T(u), i.e. Δ(T_ij(u)) = sum_k T_ik(u) ⊗ T_kj(u):
+
+        Δ(T_ij^(r)) = sum_{p+q=r} sum_k T_ik^(p) ⊗ T_kj^(q),  T^(0) = I.
+
+    Every (p, k) gives a different term, so nothing needs collecting: the
+    work is linear in the n(r-1) + 2 terms of the result. Raises ValueError
+    unless 1 <= i, j <= n.
+    """
+    if not (1 <= i <= n and 1 <= j <= n):
+        raise ValueError(f"T_{i}{j}^({r}) is not a generator of gl({n})")
+    terms = []
+    for p in range(r + 1):
+        for k in range(1, n + 1):
+            left, right = t_generator(i, k, p), t_generator(k, j, r - p)
+            if left is not None and right is not None:
+                terms.append((left, right, Fraction(1)))
+    return tuple(terms)
+
+
+def _compute_coproduct(atom: Atom, key: Optional[GeneratorKey]):
+    one = Atom("1")
 
     # Unit
-    if name == "1":
+    if atom is one:
         # Δ(1) = 1 ⊗ 1
-        return Tensor(Atom("1"), Atom("1"))
+        return Tensor(one, one)
 
-    parsed = parse_generator_name(name)
-    if parsed is None:
+    if key is None:
         # Unknown atom: treat as primitive (level-0-like)
-        return Sum([Tensor(atom, Atom("1")), Tensor(Atom("1"), atom)])
+        return Sum([Tensor(atom, one), Tensor(one, atom)])
 
-    typ, idx, level = parsed
-    level = int(level)
+    typ, idx, level = key
 
     # Level-0: primitive coproduct
     if level == 0:
-        return Sum([Tensor(atom, Atom("1")), Tensor(Atom("1"), atom)])
+        return Sum([Tensor(atom, one), Tensor(one, atom)])
 
     # Level-1 (primitive):
     #   Δ(X^{(1)}) = X^{(1)} ⊗ 1 + 1 ⊗ X^{(1)}
     if level == 1:
-        return Sum([Tensor(atom, Atom("1")), Tensor(Atom("1"), atom)])
+        return Sum([Tensor(atom, one), Tensor(one, atom)])
 
     # Level-2 (minimal symmetric correction for E-type only):
     #   Δ(E^{(2)}) = E^{(2)}⊗1 + 1⊗E^{(2)}
     #                + E^{(1)}⊗H^{(0)} + H^{(0)}⊗E^{(1)}
     if level == 2:
-        pieces = [Tensor(atom, Atom("1")), Tensor(Atom("1"), atom)]
+        pieces = [Tensor(atom, one), Tensor(one, atom)]
         if typ == "E":
             pieces.append(Tensor(Atom(f"E{idx}_1"), Atom(f"H{idx}_0")))
             pieces.append(Tensor(Atom(f"H{idx}_0"), Atom(f"E{idx}_1")))
         return Sum(pieces)
 
     # Higher levels not implemented
-    return Sum([Tensor(atom, Atom("1")), Tensor(Atom("1"), atom)])
+    return Sum([Tensor(atom, one), Tensor(one, atom)])
 
 
-def _expand_sum(parts):
-    flat = []
-    for p in parts:
-        if isinstance(p, Sum):
-            flat.extend(p.terms)
-        else:
-            flat.append(p)
-    return Sum(flat) if len(flat) > 1 else (flat[0] if flat else Sum([]))
-
+class CoproductTable:
+    """
+    Memoized Δ, keyed on GeneratorKey (on the atom itself for 1, unparseable
+    atoms and non-canonical spellings such as 'E01_2', which keep their name).
+    Stores both the expansion and its collected (left, right, coeff) terms,
+    which the (id ⊗ Δ) / (Δ ⊗ id) helpers use.
+    Generators 'Tij_r' get the RTT coproduct of gl(n) (rtt_coproduct_terms).
+    """
 
-def _tensor_factors(expr):
-    if isinstance(expr, Tensor):
-        return _tensor_factors(expr.left) + _tensor_factors(expr.right)
-    return [expr]
+    def __init__(self, n: int = 2):
+        self._n = n
+        self._by_key: Dict[GeneratorKey, Tuple[Expr, tuple]] = {}
+        self._by_atom: Dict[Atom, Tuple[Expr, tuple]] = {}
+
+    @property
+    def n(self) -> int:
+        """Rank of gl(n) for the T generators; fixed, since entries are cached without it."""
+        return self._n
+
+    def __len__(self):
+        return len(self._by_key) + len(self._by_atom)
+
+    def _entry(self, atom: Atom):
+        key = generator_key(atom.name)
+        shared = key is not None and key.name == atom.name
+        table, k = (self._by_key, key) if shared else (self._by_atom, atom)
+        entry = table.get(k)
+        if entry is None:
+            if key is not None and key.typ == "T":
+                i, j = divmod(key.index, 10)
+                terms = rtt_coproduct_terms(i, j, key.level, self.n)
+                if not shared:
+                    # the T ⊗ 1 and 1 ⊗ T terms keep the spelling asked for
+                    canonical = Atom(key.name)
+                    terms = tuple((atom if x is canonical else x, atom if y is canonical else y, c)
+                                  for x, y, c in terms)
+                expanded = Sum([Tensor(x, y) for x, y, _ in terms])
+            else:
+                expanded = _compute_coproduct(atom, key)
+                terms = tuple((t.left, t.right, c) for t, c in collect(expanded).items)
+            entry = table[k] = (expanded, terms)
+        return entry
+
+    def expand(self, atom: Atom):
+        return self._entry(atom)[0]
+
+    def terms(self, atom: Atom):
+        """Δ(atom) as a tuple of (left, right, coeff)."""
+        return self._entry(atom)[1]
+
+    def populate(self, max_level: int, indices=(1,), types="EFH"):
+        """Precompute Δ for every generator typ{index}_{level} with level <= max_level."""
+        self._entry(Atom("1"))
+        for typ in types:
+            for idx in indices:
+                for level in range(max_level + 1):
+                    self._entry(Atom(GeneratorKey(typ, idx, level).name))
+
+    def clear(self):
+        self._by_key.clear()
+        self._by_atom.clear()
+
+
+coproduct_table = CoproductTable()
 
 
-def _make_left_assoc(factors):
-    cur = factors[0]
-    for f in factors[1:]:
-        cur = Tensor(cur, f)
-    return cur
+def coproduct_expand(atom: Atom):
+    """
+    Expand Δ for 1, for generators E_i, F_i, H_i at levels 0/1/2 and for
+    T_ij^(r) ('Tij_r', any level; gl(n) with n = coproduct_table.n).
+    Always returns a Tensor or a Sum of Tensors (never a symbolic Coproduct)
+    so tests can see '⊗' in repr(). Results come from coproduct_table.
+    """
+    return coproduct_table.expand(atom)
 
 
-def _canonicalize_tensor_left(expr):
+def _flatten_tensors(expr):
+    """Replace every (nested) Tensor term by the flat MultiTensor of its legs."""
+    if isinstance(expr, LinComb):
+        return LinComb((_flatten_tensors(m), c) for m, c in expr.items)
     if isinstance(expr, Sum):
-        return Sum([_canonicalize_tensor_left(t) for t in expr.terms])
+        return Sum([_flatten_tensors(t) for t in expr.terms])
     if isinstance(expr, Tensor):
-        return _make_left_assoc(_tensor_factors(expr))
+        return MultiTensor([expr])
     return expr
 
 
 def _canonicalize_sum(expr):
-    """Recursively sort Sum terms by repr for stable equality under repr()."""
-    if isinstance(expr, Sum):
-        items = [_canonicalize_sum(t) for t in expr.terms]
-        items.sort(key=repr)
-        return Sum(items)
-    if isinstance(expr, Tensor):
-        return Tensor(_canonicalize_sum(expr.left), _canonicalize_sum(expr.right))
-    return expr
+    """Sort Sum terms, at every level, in the structural order (rewrite.sort_key)."""
+    if isinstance(expr, LinComb):
+        return LinComb((_canonicalize_sum(m), c) for m, c in expr.items)
+    done = {}
+    stack = [expr]
+    while stack:
+        node = stack[-1]
+        if node in done:
+            stack.pop()
+            continue
+        if not isinstance(node, (Sum, Tensor)):
+            stack.pop()
+            done[node] = node
+            continue
+        pending = [c for c in node.children if c not in done]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        children = [done[c] for c in node.children]
+        if isinstance(node, Sum):
+            children.sort(key=sort_key)
+        done[node] = node.with_children(children)
+    return done[expr]
+
+
+def iter_id_otimes_delta(terms):
+    """
+    (id ⊗ Δ) on a stream of (monomial, coeff) terms, yielding the expanded
+    terms lazily: Δ is expanded on the right leg of every Tensor (an atom is
+    first replaced by its own coproduct).
+    """
+    for m, c in terms:
+        if isinstance(m, Atom):
+            yield from iter_id_otimes_delta((Tensor(x, y), c * d) for x, y, d in coproduct_table.terms(m))
+        elif isinstance(m, Tensor) and isinstance(m.right, Atom):
+            left = m.left
+            for x, y, d in coproduct_table.terms(m.right):
+                yield Tensor(left, Tensor(x, y)), c * d
+        else:
+            yield m, c
+
+
+def iter_delta_otimes_id(terms):
+    """(Δ ⊗ id) on a stream of terms; see iter_id_otimes_delta."""
+    for m, c in terms:
+        if isinstance(m, Atom):
+            yield from iter_delta_otimes_id((Tensor(x, y), c * d) for x, y, d in coproduct_table.terms(m))
+        elif isinstance(m, Tensor) and isinstance(m.left, Atom):
+            right = m.right
+            for x, y, d in coproduct_table.terms(m.left):
+                yield Tensor(Tensor(x, y), right), c * d
+        else:
+            yield m, c
 
 
 def apply_id_otimes_delta(expr):
     """
     (id ⊗ Δ)(expr): expand Δ on the right tensor leg recursively.
+    Like terms of the result are collected into a LinComb; use
+    iter_id_otimes_delta(iter_terms(expr)) to stream the terms instead.
     """
-    if isinstance(expr, Sum):
-        return _expand_sum([apply_id_otimes_delta(t) for t in expr.terms])
-
-    if isinstance(expr, Tensor):
-        left = expr.left
-        right = expr.right
-        exp_right = coproduct_expand(right) if isinstance(right, Atom) else right
-        if isinstance(exp_right, Sum):
-            return _expand_sum([Tensor(left, term) for term in exp_right.terms])
-        if isinstance(exp_right, Tensor):
-            return Tensor(left, exp_right)
-        return Tensor(left, exp_right)
-
-    # If not a Tensor/Sum, try to expand if it's an Atom (rare in tests)
-    if isinstance(expr, Atom):
-        return apply_id_otimes_delta(coproduct_expand(expr))
-    return expr
+    return to_lincomb(iter_id_otimes_delta(iter_terms(expr)))
 
 
 def apply_delta_otimes_id(expr):
     """
     (Δ ⊗ id)(expr): expand Δ on the left tensor leg recursively.
+    Like terms of the result are collected into a LinComb; use
+    iter_delta_otimes_id(iter_terms(expr)) to stream the terms instead.
     """
-    if isinstance(expr, Sum):
-        return _expand_sum([apply_delta_otimes_id(t) for t in expr.terms])
-
-    if isinstance(expr, Tensor):
-        left = expr.left
-        right = expr.right
-        exp_left = coproduct_expand(left) if isinstance(left, Atom) else left
-        if isinstance(exp_left, Sum):
-            return _expand_sum([Tensor(term, right) for term in exp_left.terms])
-        if isinstance(exp_left, Tensor):
-            return Tensor(exp_left, right)
-        return Tensor(exp_left, right)
-
-    if isinstance(expr, Atom):
-        return apply_delta_otimes_id(coproduct_expand(expr))
-    return expr
+    return to_lincomb(iter_delta_otimes_id(iter_terms(expr)))
 
 
 def delta(atom: Atom):
@@ -153,15 +282,42 @@ def delta(atom: Atom):
     return coproduct_expand(atom)
 
 
+def iterated_delta(atom: Atom, k: int):
+    """
+    Δ^(k)(atom) as a LinComb of k-leg MultiTensors: Δ^(1) = id, Δ^(2) = Δ and
+    Δ^(k) = (id^{⊗(k-2)} ⊗ Δ) Δ^(k-1), i.e. the last leg is split each time.
+    """
+    if k < 1:
+        raise ValueError("k must be >= 1")
+    terms = {(atom,): Fraction(1)}
+    for _ in range(k - 1):
+        new_terms = {}
+        for legs, c in terms.items():
+            last = legs[-1]
+            if not isinstance(last, Atom):
+                raise TypeError(f"cannot expand Δ on non-atomic leg {last!r}")
+            head = legs[:-1]
+            for x, y, d in coproduct_table.terms(last):
+                key = head + (x, y)
+                new_terms[key] = new_terms.get(key, 0) + c * d
+        terms = new_terms
+    return LinComb((MultiTensor(legs), c) for legs, c in terms.items())
+
+
 def delta_associative_left(atom: Atom):
     out = apply_id_otimes_delta(delta(atom))
-    out = _canonicalize_tensor_left(out)
+    out = _flatten_tensors(out)
     out = _canonicalize_sum(out)
     return out
 
 
 def delta_associative_right(atom: Atom):
     out = apply_delta_otimes_id(delta(atom))
-    out = _canonicalize_tensor_left(out)
+    out = _flatten_tensors(out)
     out = _canonicalize_sum(out)
     return out
+
+
+def is_coassociative(atom: Atom) -> bool:
+    """(id ⊗ Δ)Δ(atom) == (Δ ⊗ id)Δ(atom), compared structurally."""
+    return delta_associative_left(atom) is delta_associative_right(atom)
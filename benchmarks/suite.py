@@ -0,0 +1,198 @@
+"""
+Scaling benchmarks for the rewrite engine, coproducts, R-matrices, RTT
+extraction and PBW normal ordering, with JSON baselines.
+
+Every case is a (name, setup) pair; setup() returns the callable that is
+timed. A run records the best of `repeat` timings per case.
+"""
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import sympy as sp
+
+from algebra.pbw import NormalOrderer
+from algebra.relations import extract_commutators_from_rtt
+from algebra.r_matrix import RMatrix, R_matrix
+from algebra.rewrite import A, Commutator, Rewriter, Sum, W, compile_pattern, default_rules, match
+from algebra.yangian import (coproduct_table, delta_associative_left, delta_associative_right,
+                             iterated_delta)
+
+Case = Tuple[str, Callable[[], Callable[[], object]]]
+
+
+def _commutator_tree(depth: int):
+    expr = A("x0")
+    for k in range(1, depth + 1):
+        expr = Commutator(expr, Sum([A(f"y{k}"), A(f"z{k}")]))
+    return expr
+
+
+def _match_cases() -> List[Case]:
+    pattern = Commutator(W("x"), Sum([W("y"), W("z")]))
+    exprs = [_commutator_tree(3), Commutator(A("a"), Sum([A("b"), A("c")])), A("a")] * 1000
+    compiled = compile_pattern(pattern)
+    return [
+        ("match/interpreted", lambda: lambda: [match(pattern, e) for e in exprs]),
+        ("match/compiled", lambda: lambda: [compiled(e, {}) for e in exprs]),
+    ]
+
+
+def _normalize_cases(depths) -> List[Case]:
+    def setup(depth):
+        expr = _commutator_tree(depth)
+        return lambda: Rewriter(default_rules).normalize(expr)
+    return [(f"normalize/depth={d}", lambda d=d: setup(d)) for d in depths]
+
+
+def _coproduct_cases(levels, legs) -> List[Case]:
+    def setup(fn):
+        coproduct_table.clear()
+        return fn
+    cases = []
+    for level in levels:
+        atom = A(f"E1_{level}")
+        cases.append((f"delta_assoc/left/level={level}",
+                      lambda atom=atom: setup(lambda: delta_associative_left(atom))))
+        cases.append((f"delta_assoc/right/level={level}",
+                      lambda atom=atom: setup(lambda: delta_associative_right(atom))))
+        for k in legs:
+            cases.append((f"iterated_delta/level={level}/legs={k}",
+                          lambda atom=atom, k=k: setup(lambda: iterated_delta(atom, k))))
+    return cases
+
+
+def _r_matrix_cases(ns) -> List[Case]:
+    z = sp.Symbol("z")
+    cases = []
+    for n in ns:
+        cases.append((f"R_matrix/dense/n={n}", lambda n=n: lambda: R_matrix(z, n)))
+        cases.append((f"R_matrix/implicit_mul/n={n}",
+                      lambda n=n: (lambda R=RMatrix(z, n), M=sp.eye(n * n): lambda: R * M)()))
+    return cases
+
+
+def _rtt_cases(orders, symbolic_orders) -> List[Case]:
+    z, w = sp.symbols("z w")
+
+    def symbolic(order):
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                extract_commutators_from_rtt(z, w, 2, order)
+        return run
+
+    cases = []
+    for order in orders:
+        for n in (2, 4):
+            cases.append((f"rtt/coefficients/n={n}/max_order={order}",
+                          lambda n=n, order=order: lambda: extract_commutators_from_rtt(
+                              z, w, n, order, mode="coefficients")))
+    for order in symbolic_orders:
+        cases.append((f"rtt/symbolic/n=2/max_order={order}", lambda order=order: symbolic(order)))
+    return cases
+
+
+def _pbw_cases(degrees) -> List[Case]:
+    def setup(degree):
+        # a fixed random gl(3) word with levels 1 and 2; a fresh orderer so nothing is memoized
+        rng = random.Random(degree)
+        keys = [(rng.randint(1, 3), rng.randint(1, 3), rng.randint(1, 2)) for _ in range(degree)]
+        return lambda: NormalOrderer(3).normal_order(keys)
+    return [(f"pbw/gl3/degree={d}", lambda d=d: setup(d)) for d in degrees]
+
+
+def all_cases(quick: bool = False) -> List[Case]:
+    if quick:
+        return (_match_cases() + _normalize_cases(range(2, 6)) + _coproduct_cases(range(3), (3, 4))
+                + _r_matrix_cases(range(2, 5)) + _rtt_cases((1, 2, 3), ()) + _pbw_cases((4, 6)))
+    return (_match_cases() + _normalize_cases(range(2, 11)) + _coproduct_cases(range(3), range(3, 9))
+            + _r_matrix_cases(range(2, 7)) + _rtt_cases(range(1, 6), (1, 2)) + _pbw_cases(range(4, 11, 2)))
+
+
+def run(cases: List[Case], repeat: int = 3, pattern: Optional[str] = None,
+        report: Optional[Callable[[str, float], None]] = None) -> Dict[str, float]:
+    """Best-of-repeat wall time in seconds for every case whose name contains pattern."""
+    results = {}
+    for name, setup in cases:
+        if pattern and pattern not in name:
+            continue
+        best = float("inf")
+        for _ in range(repeat):
+            fn = setup()
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+        if report is not None:
+            report(name, best)
+    return results
+
+
+class Regression(NamedTuple):
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self):
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+def compare(baseline: Dict[str, float], current: Dict[str, float], threshold: float = 0.25,
+            min_time: float = 1e-4) -> List[Regression]:
+    """Cases slower than baseline by more than threshold (a fraction); sub-min_time timings are ignored."""
+    out = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None or max(before, now) < min_time:
+            continue
+        if now > before * (1 + threshold):
+            out.append(Regression(name, before, now))
+    return out
+
+
+def save(results: Dict[str, float], path: str):
+    data = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "sympy": sp.__version__},
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> Dict[str, float]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this string")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", metavar="JSON", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown as a fraction of the baseline (default 0.25)")
+    args = parser.parse_args(argv)
+
+    results = run(all_cases(args.quick), args.repeat, args.pattern,
+                  report=lambda name, t: print(f"{name:50s} {t * 1e3:12.3f} ms", flush=True))
+    if args.save:
+        save(results, args.save)
+    if args.compare:
+        regressions = compare(load(args.compare), results, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r.name}: {r.baseline * 1e3:.3f} ms -> {r.current * 1e3:.3f} ms "
+                  f"(x{r.ratio:.2f})", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
@@ -0,0 +1,17 @@
+from benchmarks.suite import all_cases, compare, load, main, run, save
+
+
+def test_compare_flags_slowdowns_beyond_threshold():
+    baseline = {"a": 1.0, "b": 1.0, "tiny": 1e-6}
+    current = {"a": 1.2, "b": 1.5, "tiny": 1e-5, "new": 3.0}
+    assert [r.name for r in compare(baseline, current, threshold=0.25)] == ["b"]
+    assert compare(baseline, current, threshold=0.6) == []
+
+
+def test_quick_run_and_baseline_roundtrip(tmp_path):
+    results = run(all_cases(quick=True), repeat=1, pattern="match/")
+    assert set(results) == {"match/interpreted", "match/compiled"}
+    path = str(tmp_path / "baseline.json")
+    save(results, path)
+    assert load(path) == results
+    assert main(["--quick", "--repeat", "1", "-k", "rtt/coefficients/n=2", "--compare", path]) == 0
@@ -0,0 +1,110 @@
+import pickle
+
+import pytest
+
+from algebra.completion import (CompletionError, LexPathOrder, cached_complete, complete,
+                                critical_pairs, unify)
+from algebra.rewrite import *
+from algebra.serialize import DiskCache
+
+x, y, z = W('x'), W('y'), W('z')
+ZERO = Sum([])
+
+
+def _system(rules):
+    return {(r.lhs, r.rhs) for r in rules}
+
+
+def test_unification_and_critical_pairs():
+    assert unify(Commutator(x, Coproduct(y)), Commutator(A('e'), x)) is None
+    sigma = unify(Commutator(x, Coproduct(y)), Commutator(Coproduct(z), Coproduct(A('e'))))
+    assert sigma == {'x': Coproduct(z), 'y': A('e')}
+    assert unify(x, Coproduct(x)) is None
+
+    # Δ([x, y]) -> [Δx, Δy] overlaps [x, x] -> 0 inside its lhs
+    pairs = critical_pairs(Coproduct(Commutator(x, y)), Commutator(Coproduct(x), Coproduct(y)),
+                           Commutator(x, x), ZERO)
+    assert pairs == [(Commutator(Coproduct(x), Coproduct(x)), Coproduct(ZERO))]
+
+
+def test_lex_path_order():
+    order = LexPathOrder()
+    assert order.greater(Coproduct(Commutator(x, y)), Commutator(Coproduct(x), Coproduct(y)))
+    assert order.greater(Commutator(x, Sum([y, z])), Sum([Commutator(x, y), Commutator(x, z)]))
+    assert order.compare(Commutator(x, y), Commutator(y, x)) == 0
+    assert order.compare(Commutator(A('f'), A('e')), Commutator(A('e'), A('f'))) == 1
+    assert not order.greater(x, Commutator(x, x)) and order.greater(Commutator(x, x), x)
+
+
+def test_completion_adds_the_missing_rules():
+    rules = [rule(Coproduct(Commutator(x, y)), Commutator(Coproduct(x), Coproduct(y)), "delta-bracket"),
+             rule(Commutator(x, x), ZERO)]
+    assert Rewriter(rules).normalize(Coproduct(Commutator(A('e'), A('e')))) is Coproduct(ZERO)
+    done = complete(rules)
+    assert _system(done) == {(Coproduct(Commutator(x, y)), Commutator(Coproduct(x), Coproduct(y))),
+                             (Commutator(x, x), ZERO), (Coproduct(ZERO), ZERO)}
+    assert "delta-bracket" in [r.name for r in done]
+    assert Rewriter(done).normalize(Coproduct(Commutator(A('e'), A('e')))) is ZERO
+
+
+def test_completion_of_group_axioms():
+    # [a, b] as the group product, Δ(a) as the inverse, '1' as the unit
+    one, m, inv = A('1'), Commutator, Coproduct
+    rules = [rule(m(one, x), x), rule(m(inv(x), x), one), rule(m(m(x, y), z), m(x, m(y, z)))]
+    done = complete(rules, LexPathOrder(['1', Commutator, Coproduct]))
+    assert len(done) == 10
+    with pytest.raises(CompletionError):
+        complete(rules, LexPathOrder(['1', Commutator, Coproduct]), max_rules=5)
+    rw = Rewriter(done)
+    a, b, c = A('a'), A('b'), A('c')
+    assert rw.normalize(inv(m(a, b))) is m(inv(b), inv(a))
+    assert rw.normalize(m(m(a, inv(m(b, c))), m(m(b, c), inv(a)))) is one
+    assert rw.normalize(inv(inv(m(a, one)))) is a
+
+
+def test_unorientable_equations_become_ordered_rules():
+    e, f, h = A('e'), A('f'), A('h')
+    done = complete([rule(Commutator(x, y), Commutator(y, x))])
+    assert len(done) == 1
+    rw = Rewriter(done)
+    assert rw.normalize(Commutator(f, e)) is Commutator(e, f)
+    assert rw.normalize(Commutator(e, f)) is Commutator(e, f)
+    assert rw.normalize(Commutator(Commutator(h, f), e)) is Commutator(e, Commutator(f, h))
+    assert pickle.loads(pickle.dumps(done))[0].apply(Commutator(h, e)) is Commutator(e, h)
+    # a root the order rejects does not hide the redexes below it
+    assert done[0].apply(Commutator(e, Commutator(f, e))) is None
+    assert done[0].try_apply(Commutator(e, Commutator(f, e))) is Commutator(e, Commutator(e, f))
+
+
+def test_completion_modulo_scalars():
+    # without folding -1 * -1 * [x, y] into [x, y] every power of -1 became a new rule
+    e, f, minus = A('e'), A('f'), A('-1')
+    done = complete([rule(Commutator(x, y), Product([minus, Commutator(y, x)])), rule(Commutator(x, x), ZERO)])
+    assert len(done) == 2
+    rw = Rewriter(done)
+    assert rw.normalize(Commutator(f, e)) is Product([minus, Commutator(e, f)])
+    assert rw.normalize(Commutator(e, f)) is Commutator(e, f)
+    assert rw.normalize(Commutator(e, e)) is ZERO
+    assert Rewriter(done, collect=True).normalize(Product([minus, Commutator(f, e)])) is LinComb({Commutator(e, f): 1})
+
+
+def test_rules_without_templates_are_kept_and_used():
+    # linearity has no template: it is kept in front and normalizes the pairs
+    rules = default_rules[:2] + [rule(Commutator(x, x), ZERO), rule(Commutator(A('f'), A('e')), A('h'))]
+    done = complete(rules)
+    assert done[:2] == default_rules[:2]
+    rw = Rewriter(done)
+    assert rw.normalize(Commutator(Sum([A('f'), A('e')]), A('e'))) is Sum([A('h')])
+
+
+def test_completed_rules_are_cached(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    rules = [rule(Coproduct(Commutator(x, y)), Commutator(Coproduct(x), Coproduct(y))),
+             rule(Commutator(x, x), ZERO), rule(Commutator(x, y), Commutator(y, x), "symmetry")]
+    first = cached_complete(rules, cache=cache)
+    assert len(list(tmp_path.rglob("*.ygxr"))) == 1
+    again = cached_complete(rules, cache=cache)
+    assert [(r.lhs, r.rhs, r.name) for r in again] == [(r.lhs, r.rhs, r.name) for r in first]
+    assert _system(first) == _system(complete(rules))
+    expr = Coproduct(Commutator(A('f'), A('e')))
+    assert Rewriter(again).normalize(expr) is Rewriter(first).normalize(expr)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from algebra.generator import T
+from algebra.numeric import (NumericRepresentation, check_relation_table_numeric,
+                             check_rtt_numeric, random_representation, rtt_residual)
+from algebra.relations import check_RTT_relation, rtt_commutation_table
+
+
+def test_numeric_rtt_check_passes():
+    result = check_rtt_numeric(n=2, sites=3, samples=32, seed=0)
+    assert result.passed
+    assert result.max_residual < 1e-9
+    assert check_RTT_relation(None, None, n=3, mode="numeric")
+
+
+def test_numeric_rtt_check_detects_non_representations():
+    rng = np.random.default_rng(0)
+    bogus = NumericRepresentation(rng.normal(size=(3, 2, 2, 4, 4)) + 0j)
+    zs = rng.normal(size=8) + 1j
+    assert rtt_residual(bogus, zs, zs + 1) > 1e-3
+
+
+def test_generator_matrices_and_relation_table():
+    rep = random_representation(2, 2, rng=1)
+    assert np.allclose(rep[T(1, 1, 0)], np.eye(4))
+    assert np.allclose(rep[(2, 1, 7)], 0)
+    table = rtt_commutation_table(2, 3)
+    assert check_relation_table_numeric(table, seed=0).passed
+    table[(1, 2, 1), (2, 1, 1)] = {((1, 1, 1),): 1}
+    assert not check_relation_table_numeric(table, seed=0).passed
+
+
+def test_expression_evaluation_in_shifted_representations():
+    from algebra.numeric import EvaluationRepresentation, compile_expr, evaluate
+    from algebra.rewrite import A, Commutator, LinComb, Product, Sum, Tensor
+    from algebra.yangian import iterated_delta
+    rng = np.random.default_rng(5)
+    rep = random_representation(n=2, sites=2, rng=rng)
+    evrep = EvaluationRepresentation(rep, rng.normal(size=3) + 1j * rng.normal(size=3))
+    x, y = A('T12_2'), A('T21_1')
+    vx, vy = evaluate(x, evrep), evaluate(y, evrep)
+    assert np.allclose(vx[0], rep[1, 2, 2] + evrep.shifts[0] * rep[1, 2, 1])
+    assert np.allclose(evaluate(Tensor(x, y), evrep)[1], np.kron(vx[1], vy[1]))
+    assert np.allclose(evaluate(LinComb({Product([x, y]): 2, A('1'): -1}), evrep),
+                       2 * vx @ vy - np.eye(rep.dim))
+    assert not evaluate(Sum([]), evrep).any()
+    for bad in ('T1_1', 'T13_2', 'T30_1'):
+        with pytest.raises(KeyError):
+            evaluate(A(bad), evrep)
+    plan = compile_expr(Commutator(Commutator(Commutator(x, y), y), x), evrep)
+    c = vx @ vy - vy @ vx
+    c = c @ vy - vy @ c
+    assert np.allclose(plan.run(), c @ vx - vx @ c) and np.allclose(plan.run(), c @ vx - vx @ c)
+    assert len(plan._sizes) < len(plan.steps)
+    expr = iterated_delta(A('T12_3'), 3)
+    legs = lambda m: [evaluate(leg, evrep) for leg in m.legs]
+    brute = sum(float(c) * np.stack([np.kron(np.kron(a[b], m2[b]), m3[b]) for b in range(3)])
+                for m, c in expr.items for a, m2, m3 in [legs(m)])
+    assert np.allclose(evaluate(expr, evrep), brute)
+
+
+def test_relations_and_coproduct_hold_numerically():
+    from algebra.numeric import check_identity_numeric
+    from algebra.pbw import generator_atom
+    from algebra.rewrite import Commutator, LinComb, Product
+    from algebra.yangian import delta
+    table = rtt_commutation_table(2, 2)
+
+    def monomial(m, image=lambda g: generator_atom(g)):
+        factors = [image(g) for g in m]
+        return factors[0] if len(factors) == 1 else Product(factors)
+
+    for (g, h) in [((1, 2, 2), (2, 1, 1)), ((1, 1, 2), (1, 2, 2)), ((2, 1, 2), (1, 2, 2))]:
+        rel = table[g, h]
+        lhs = Commutator(generator_atom(g), generator_atom(h))
+        assert check_identity_numeric(lhs, LinComb((monomial(m), c) for m, c in rel.items()), seed=1).passed
+        # Δ is an algebra map: Δ[T_g, T_h] = sum c Δ(monomial)
+        image = lambda k: delta(generator_atom(k))
+        lhs = Commutator(image(g), image(h))
+        rhs = LinComb((monomial(m, image), c) for m, c in rel.items())
+        assert check_identity_numeric(lhs, rhs, seed=2).passed
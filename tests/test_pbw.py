@@ -0,0 +1,50 @@
+import random
+from functools import reduce
+
+import numpy as np
+from algebra.generator import T
+from algebra.numeric import random_representation
+from algebra.pbw import NormalOrderer, generator_atom
+from algebra.rewrite import A, LinComb, Product
+from algebra.structure import StructureConstants
+
+
+def _evaluate(rep, orderer, terms):
+    dim = rep.dim
+    total = np.zeros((dim, dim), dtype=complex)
+    for w, c in terms.items():
+        total += complex(c) * reduce(np.matmul, [rep[orderer.key(g)] for g in w], np.eye(dim))
+    return total
+
+
+def test_normal_order_of_a_pair():
+    no = NormalOrderer(2)
+    out = no.normal_order([T(2, 1, 1), T(1, 2, 1)])
+    # T21 T12 = T12 T21 + [T21, T12] = T12 T21 + T11 - T22
+    w = no.word
+    assert out == {w([(1, 2, 1), (2, 1, 1)]): 1, w([(1, 1, 1)]): 1, w([(2, 2, 1)]): -1}
+    assert no.normal_order([(1, 1, 1), (1, 2, 1)]) == {w([(1, 1, 1), (1, 2, 1)]): 1}
+    assert no.to_lincomb(out) == LinComb({Product([A('T12_1'), A('T21_1')]): 1, A('T11_1'): 1,
+                                          A('T22_1'): -1})
+    assert generator_atom((2, 3, 4)) is A('T23_4')
+
+
+def test_normal_order_agrees_with_a_representation():
+    rng = random.Random(0)
+    rep = random_representation(n=3, sites=2, rng=1)
+    no = NormalOrderer(3, StructureConstants.build(3, 2))
+    for _ in range(5):
+        keys = [(rng.randint(1, 3), rng.randint(1, 3), rng.randint(1, 2)) for _ in range(4)]
+        out = no.normal_order(keys)
+        assert all(list(w) == sorted(w) for w in out)
+        expected = _evaluate(rep, no, {no.word(keys): 1})
+        assert np.allclose(_evaluate(rep, no, out), expected)
+
+
+def test_degree_ten_in_gl3():
+    rng = random.Random(1)
+    no = NormalOrderer(3, StructureConstants.build(3, 2))
+    keys = [(rng.randint(1, 3), rng.randint(1, 3), rng.randint(1, 2)) for _ in range(10)]
+    out = no.normal_order(keys)
+    assert len(out) > 100 and all(list(w) == sorted(w) for w in out)
+    assert no.normal_order(keys) == out
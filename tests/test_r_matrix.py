@@ -0,0 +1,23 @@
+import sympy as sp
+from algebra.r_matrix import RMatrix, R_matrix, permutation_matrix
+
+
+def test_implicit_r_matrix_matches_dense():
+    z = sp.symbols('z')
+    n = 3
+    R = RMatrix(z, n)
+    dense = R_matrix(z, n)
+    assert R.to_dense() == dense
+    M = sp.Matrix(n * n, n * n, lambda i, j: sp.Symbol(f"m{i}_{j}"))
+    assert sp.simplify(R * M - dense * M) == sp.zeros(n * n, n * n)
+    assert sp.simplify(M * R - M * dense) == sp.zeros(n * n, n * n)
+    assert all(R.entry(r, c) == dense[r, c] for r in range(n * n) for c in range(n * n))
+    assert len(list(R.nonzeros())) == n * n + n * (n - 1)
+
+
+def test_apply_to_tensor_indices():
+    z = sp.symbols('z')
+    R = RMatrix(z, 4)
+    assert R.apply(0, 2) == {(0, 2): 1, (2, 0): 1 / z}
+    assert R.apply(1, 1) == {(1, 1): 1 + 1 / z}
+    assert permutation_matrix(2)[1, 2] == 1
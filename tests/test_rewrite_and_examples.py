@@ -1,4 +1,5 @@
 import pytest
+from fractions import Fraction
 from algebra.rewrite import *
 
 
@@ -47,3 +48,257 @@ def test_coproduct_coassociativity_like_structure():
     # with no rules, normalize is identity
     out = default_rewriter.normalize(expr)
     assert out == expr
+
+
+def test_nodes_are_interned_and_immutable():
+    import pickle
+    a = Commutator(A('e'), Sum([A('f'), A('h')]))
+    b = Commutator(A('e'), Sum([A('f'), A('h')]))
+    assert a is b
+    assert hash(a) == hash(b)
+    assert Sum([A('e'), Sum([A('f')])]) is Sum([A('e'), A('f')])
+    assert pickle.loads(pickle.dumps(a)) is a
+    with pytest.raises(AttributeError):
+        a.a = A('x')
+
+
+def test_normalize_reports_fixpoint():
+    a, b, c, d, e = (A(n) for n in 'abcde')
+    nested = Commutator(Commutator(a, Sum([b, c])), Sum([d, e]))
+    res = default_rewriter.run(nested)
+    assert res.fixpoint
+    assert isinstance(res.expr, Sum) and len(res.expr.terms) == 4
+    assert default_rewriter.normalize(res.expr) is res.expr
+    partial = Rewriter(default_rules).run(nested, max_steps=1)
+    assert not partial.fixpoint
+    assert partial.steps == 1
+
+
+def test_normal_form_cache():
+    e, f, h = A('e'), A('f'), A('h')
+    rw = Rewriter(default_rules, cache_size=2)
+    expr = Commutator(h, Sum([e, f]))
+    out = rw.normalize(expr)
+    assert rw.cache_info().currsize == 2
+    hits = rw.cache_info().hits
+    assert rw.normalize(expr) is out
+    assert rw.cache_info().hits == hits + 1
+    rw.add_rule(rule(Commutator(W('x'), W('x')), Sum([])))
+    assert rw.cache_info() == CacheInfo(0, 0, 2, 0)
+
+
+def test_compiled_matcher_agrees_with_match():
+    x, y, z = A('x'), A('y'), A('z')
+    patterns = [
+        W('a'),
+        Commutator(W('a'), W('a')),
+        Commutator(W('a'), Sum([W('b'), W('c')])),
+        Tensor(Product([x, W('a')]), Coproduct(W('b'))),
+        Sum([x, W('a')]),
+        Sum([W('a'), S('rest')]),
+        Commutator(Sum([W('a'), W('b')]), W('b')),
+        Commutator(x, y),
+        Commutator(Sum([x, y]), z),
+        Sum([Commutator(Sum([x, y]), z), W('a')]),
+        Commutator(W('a'), W('a')),
+    ]
+    exprs = [
+        x,
+        Commutator(x, x),
+        Commutator(x, y),
+        Commutator(x, Sum([y, z])),
+        Commutator(x, Sum([y, z, x])),
+        Tensor(Product([x, y]), Coproduct(z)),
+        Tensor(Product([y, x]), Coproduct(z)),
+        Sum([x, z]),
+        Sum([z, x]),
+        Commutator(Sum([x, y]), x),
+        Commutator(Sum([y, x]), z),
+        Sum([x, Commutator(Sum([y, x]), z)]),
+        Commutator(Sum([x, y]), Sum([y, x])),
+    ]
+    for pat in patterns:
+        compiled = compile_pattern(pat)
+        for e in exprs:
+            assert compiled(e, {}) == match(pat, e)
+    # ground Sums inside a pattern match up to term order, in rules too
+    assert match(Commutator(Sum([x, y]), z), Commutator(Sum([y, x]), z)) == {}
+    swap = RewriteRule(Commutator(Sum([x, y]), z), lambda env: z)
+    assert swap.apply(Commutator(Sum([y, x]), z)) is z
+
+
+def test_linear_combination_collects_like_terms():
+    a, b = A('a'), A('b')
+    ab = Commutator(a, b)
+    assert len(collect(Sum([ab, Product([A('-1'), ab])]))) == 0
+    lc = collect(Sum([ab, ab, Product([A('1/2'), a, Sum([b, A('2')])])]))
+    assert lc.coefficient(ab) == 2
+    assert lc.coefficient(Product([a, b])) == Fraction(1, 2)
+    assert lc.coefficient(a) == 1
+    assert LinComb({a: 1, b: 2}) is LinComb([(b, 2), (a, 1)])
+    assert (lc - lc) is LinComb()
+    # normalization output collects to canonical combinations
+    out = collect(default_rewriter.normalize(Commutator(Sum([a, b]), Sum([a, b]))))
+    assert out is LinComb({Commutator(a, a): 1, Commutator(b, b): 1})
+
+
+def test_collecting_rewriter_cancels_like_terms():
+    a, b = A('a'), A('b')
+    rw = Rewriter(default_rules, collect=True)
+    assert default_rewriter.normalize(Sum([Commutator(a, b), Commutator(b, a)])) is not LinComb()
+    assert rw.normalize(Sum([Commutator(a, b), Commutator(b, a)])) is LinComb()
+    assert rw.normalize(Commutator(Sum([a, a]), Sum([b, b]))) is LinComb({Commutator(a, b): 4})
+    res = rw.run(Commutator(Sum([b, a]), Sum([a, b])))
+    assert res.fixpoint and res.expr is LinComb({Commutator(a, a): 1, Commutator(b, b): 1})
+    assert rw.normalize_many([Commutator(Sum([a, a]), b)], workers=2)[0].expr is LinComb({Commutator(a, b): 2})
+    # scalars inside (nested) brackets are pulled out before terms are merged
+    c = A('c')
+    assert rw.normalize(Sum([Commutator(Commutator(b, a), c), Commutator(Commutator(a, b), c)])) is LinComb()
+    assert rw.normalize(Commutator(Sum([a, Product([A('-1'), a])]), b)) is LinComb()
+    assert collect(Commutator(Product([A('2'), a]), Commutator(b, Product([A('-1'), c])))) is \
+        LinComb({Commutator(a, Commutator(b, c)): -2})
+
+
+def test_structural_order():
+    a, b = A('a'), A('b')
+    assert sort_key(a) < sort_key(b) < sort_key(Commutator(a, a))
+    assert sort_key(Commutator(a, b)) < sort_key(Commutator(b, a))
+    exprs = [Sum([b, a]), Tensor(a, b), Commutator(b, a), a, Product([a, b])]
+    ordered = sorted(exprs, key=sort_key)
+    assert ordered == sorted(reversed(exprs), key=sort_key)
+    assert ordered[0] is a
+
+
+def test_rules_pickle_including_closures():
+    import pickle
+    rules = pickle.loads(pickle.dumps(default_rules + [rule(Commutator(W('x'), W('x')), Sum([]))]))
+    rw = Rewriter(rules)
+    e, f, h = A('e'), A('f'), A('h')
+    assert rw.normalize(Commutator(h, Sum([e, f]))) is default_rewriter.normalize(Commutator(h, Sum([e, f])))
+    assert rw.normalize(Commutator(e, e)) is Sum([])
+
+
+def test_normalize_many_keeps_order_and_reports_failures():
+    e, f, h = A('e'), A('f'), A('h')
+    bad = A('bad')
+
+    def explode(env):
+        raise ValueError("cannot rewrite " + repr(env['x']))
+
+    rw = Rewriter(default_rules + [RewriteRule(Coproduct(W('x')), explode)])
+    exprs = [Commutator(h, Sum([e, f])), Coproduct(bad), Commutator(f, Sum([e, h])), Commutator(e, f)]
+    for workers in (2, 1):
+        results = rw.normalize_many(exprs, workers=workers, chunksize=1)
+        assert [r.expr for r in results[::2]] == [rw.normalize(x) for x in exprs[::2]]
+        assert results[1].expr is Coproduct(bad) and not results[1].fixpoint
+        assert isinstance(results[1].error, ValueError)
+        assert results[3].error is None and results[3].fixpoint
+
+
+def test_normalize_many_ships_deep_expressions():
+    e, f, h = A('e'), A('f'), A('h')
+    deep, expected = Commutator(h, Sum([e, f])), default_rewriter.normalize(Commutator(h, Sum([e, f])))
+    for k in range(5000):
+        deep, expected = Tensor(deep, A(f'x{k % 7}')), Tensor(expected, A(f'x{k % 7}'))
+    res, = Rewriter(default_rules).normalize_many([deep], workers=2)
+    assert res.error is None and res.fixpoint
+    assert res.expr is expected
+
+
+def test_instrumentation_counts_and_traces():
+    e, f, h = A('e'), A('f'), A('h')
+    steps = []
+    rw = Rewriter(default_rules)
+    rw.instrument(trace=lambda r, before, after: steps.append((r.name, before, after)))
+    out = rw.normalize(Commutator(h, Sum([e, f])))
+    stats = {r.name: st for r, st in rw.rule_stats.items()}
+    assert stats['linearity-right'].fires == 1
+    assert stats['antisymmetry'].fires == 2
+    assert stats['antisymmetry'].attempts >= 2 and stats['antisymmetry'].seconds >= 0
+    assert [name for name, _, _ in steps] == ['linearity-right', 'antisymmetry', 'antisymmetry']
+    assert rw.runs == 1 and rw.last_result.fixpoint and rw.last_result.steps == 3
+    assert 'antisymmetry' in rw.stats_report()
+    rw.instrument(False)
+    rw.cache_clear()
+    assert rw.normalize(Commutator(h, Sum([e, f]))) is out
+    assert len(steps) == 3 and rw.runs == 1
+
+
+def test_traversals_handle_deep_expressions():
+    e, f, h, x = A('e'), A('f'), A('h'), A('x')
+    depth = 5000
+
+    def chain(bottom):
+        node = bottom
+        for _ in range(depth):
+            node = Tensor(node, x)
+        return node
+
+    deep = chain(Commutator(h, Sum([e, f])))
+    env = match(chain(W('c')), deep)
+    assert env['c'] is Commutator(h, Sum([e, f]))
+    assert substitute(chain(W('c')), env) is deep
+    assert default_rules[0].try_apply(deep) is chain(Sum([Commutator(h, e), Commutator(h, f)]))
+    out = Rewriter(default_rules).normalize(deep)
+    minus = A('-1')
+    assert out is chain(Sum([Product([minus, Commutator(e, h)]), Product([minus, Commutator(f, h)])]))
+    assert collect(deep) is LinComb({chain(Commutator(h, e)): 1, chain(Commutator(h, f)): 1})
+
+    def nest(bottom, u, swap=False):
+        node = bottom
+        for _ in range(depth):
+            terms = [u, Tensor(node, u)]
+            node = Sum(terms[::-1] if swap else terms)
+        return node
+
+    pat = nest(Commutator(W('c'), Sum([e, f])), W('u'))
+    assert match(pat, nest(Commutator(h, Sum([f, e])), x)) == {'u': x, 'c': h}
+    # every level's positional try fails and falls back to matching up to term order
+    assert match(pat, nest(Commutator(h, Sum([f, e])), x, swap=True)) == {'u': x, 'c': h}
+    assert match(pat, nest(Commutator(h, Sum([f, h])), x, swap=True)) is None
+
+
+def test_sum_patterns_match_up_to_term_order():
+    x, y, z = A('x'), A('y'), A('z')
+    assert match(Sum([x, W('a')]), Sum([z, x])) == {'a': z}
+    # positional assignment is tried first
+    assert match(Sum([W('a'), W('b')]), Sum([x, y])) == {'a': x, 'b': y}
+    # siblings outside the Sum can force another assignment
+    assert match(Commutator(Sum([W('a'), W('b')]), W('b')), Commutator(Sum([x, y]), x)) == {'a': y, 'b': x}
+    assert match(Sum([Commutator(x, W('a')), W('b')]), Sum([y, Commutator(x, z)])) == {'a': z, 'b': y}
+    assert match(Sum([W('a'), W('a')]), Sum([x, y])) is None
+    assert match(Sum([x, x, W('a')]), Sum([x, y, x])) == {'a': y}
+    assert match(Sum([x, W('a')]), Sum([y, z, x])) is None
+
+
+def test_sequence_wildcards_bind_and_splice_the_remaining_terms():
+    x, y, z = A('x'), A('y'), A('z')
+    env = match(Sum([y, S('rest')]), Sum([x, y, z]))
+    assert env == {'rest': Sum([x, z])}
+    assert match(Sum([x, y, S('rest')]), Sum([y, x])) == {'rest': Sum([])}
+    assert match(Sum([x, S('rest')]), Sum([y, z])) is None
+    assert substitute(Sum([Commutator(x, x), S('rest')]), env) is Sum([Commutator(x, x), x, z])
+    with pytest.raises(ValueError):
+        match(Commutator(S('rest'), x), Commutator(x, x))
+
+
+def test_repeated_sequence_wildcard_binds_the_same_terms():
+    a, b, c, d, e = A('a'), A('b'), A('c'), A('d'), A('e')
+    pat = Sum([a, S('s'), Commutator(Sum([b, S('s')]), c)])
+    assert match(pat, Sum([a, d, Commutator(Sum([b, e]), c)])) is None
+    assert compile_pattern(pat)(Sum([a, d, Commutator(Sum([b, e]), c)]), {}) is None
+    env = match(pat, Sum([Commutator(Sum([d, e, b]), c), e, a, d]))
+    # the first binding is kept; the other occurrence only has to agree up to order
+    assert env == {'s': Sum([d, e])}
+    assert substitute(pat, env) is Sum([a, d, e, Commutator(Sum([b, d, e]), c)])
+
+
+def test_linearity_distributes_over_long_sums_in_one_step():
+    h = A('h')
+    terms = [A(f'e{k}') for k in range(500)]
+    rw = Rewriter(default_rules)
+    rw.instrument()
+    out = rw.normalize(Commutator(h, Sum(terms)))
+    assert isinstance(out, Sum) and len(out.terms) == 500
+    stats = {r.name: st for r, st in rw.rule_stats.items()}
+    assert stats['linearity-right'].fires == 1
@@ -3,3 +3,23 @@ import sympy as sp
 
 z, w = sp.symbols('z w')
 extract_commutators_from_rtt(z, w)
+
+
+def test_coefficient_mode_level_one_is_gl_n():
+    from algebra.relations import rtt_commutation_table
+    table = extract_commutators_from_rtt(z, w, n=3, max_order=1, mode="coefficients")
+    assert table == rtt_commutation_table(3, 1)
+    assert len(table) == 81
+    # [T_ij^(1), T_kl^(1)] = δ_il T_kj^(1) - δ_kj T_il^(1)
+    assert table[(1, 2, 1), (2, 1, 1)] == {((2, 2, 1),): 1, ((1, 1, 1),): -1}
+    assert table[(1, 2, 1), (1, 3, 1)] == {}
+
+
+def test_coefficient_mode_scales():
+    from algebra.relations import rtt_commutation_table
+    table = rtt_commutation_table(4, 5)
+    assert len(table) == 80 * 80
+    rel = table[(1, 2, 3), (2, 1, 2)]
+    assert rel[((2, 2, 4),)] == 1
+    assert rel[((2, 2, 3), (1, 1, 1))] == 1
+    assert rel[((2, 2, 1), (1, 1, 3))] == -1
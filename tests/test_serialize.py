@@ -0,0 +1,52 @@
+from fractions import Fraction
+
+from algebra.relations import rtt_commutation_table
+from algebra.rewrite import A, Commutator, LinComb, MultiTensor, Product, Sum, Tensor, W, Coproduct
+from algebra.serialize import (DiskCache, TableFile, cached_commutation_table,
+                               cached_exprs, dump_table, dumps_exprs, loads_exprs)
+from algebra.yangian import delta_associative_left, iterated_delta
+
+
+def test_expression_roundtrip_shares_subterms():
+    e, f = A('e'), A('f')
+    shared = Commutator(e, Sum([e, f]))
+    exprs = [
+        Product([shared, shared, A('-1')]),
+        Tensor(Coproduct(shared), W('x')),
+        LinComb({shared: Fraction(-3, 2), MultiTensor([e, f, e]): 2}),
+        delta_associative_left(A('E1_2')),
+    ]
+    data = dumps_exprs(exprs)
+    assert loads_exprs(data) == exprs
+    assert data.count(b'E1_2') == 1
+
+
+def test_memory_mapped_files_and_cache(tmp_path):
+    deep = A('x')
+    for k in range(5000):
+        deep = Tensor(deep, A(f"y{k % 3}"))
+    exprs = [iterated_delta(A('E1_2'), 5), deep]
+    cache = DiskCache(str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return exprs
+
+    with cached_exprs(("demo", 5), compute, cache) as f:
+        assert len(f) == 2 and f[1] is deep and f[-2] is exprs[0]
+    with cached_exprs(("demo", 5), compute, cache) as f:
+        assert f[0] is exprs[0]
+    assert len(calls) == 1
+
+    table = rtt_commutation_table(3, 2)
+    with cached_commutation_table(3, 2, cache) as mapped:
+        assert len(mapped) == len(table)
+        key = ((1, 2, 2), (2, 1, 1))
+        assert mapped[key] == table[key]
+        assert ((9, 9, 9), (1, 1, 1)) not in mapped
+        assert mapped.to_dict() == table
+    path = str(tmp_path / 't.ygxt')
+    dump_table(table, path)
+    with TableFile(path) as mapped:
+        assert mapped[(1, 1, 1), (1, 1, 1)] == {}
@@ -0,0 +1,26 @@
+from itertools import islice
+
+from algebra.rewrite import A, LinComb, Sum, Tensor, collect
+from algebra.stream import collect_chunks, iter_terms, to_lincomb, write_terms
+from algebra.yangian import apply_id_otimes_delta, delta, iter_delta_otimes_id, iter_id_otimes_delta
+
+
+def test_streamed_expansion_matches_eager():
+    expr = Sum([delta(A('E1_2')), delta(A('E1_2')), Tensor(A('H1_0'), Sum([A('E1_1'), A('F1_2')]))])
+    eager = apply_id_otimes_delta(expr)
+    assert to_lincomb(iter_id_otimes_delta(iter_terms(expr))) is eager
+    assert to_lincomb(collect_chunks(iter_id_otimes_delta(iter_terms(expr)), chunk_size=3)) is eager
+
+
+def test_stream_is_lazy_and_chunks_merge():
+    def many():
+        for k in range(10 ** 9):
+            yield Tensor(A(f"E{k}_1"), A('H1_0')), 1
+
+    first = list(islice(iter_delta_otimes_id(many()), 4))
+    assert len(first) == 4
+    terms = [(A('x'), 1), (A('x'), -1), (A('y'), 2), (A('y'), 1)]
+    assert list(collect_chunks(terms, chunk_size=2)) == [(A('y'), 3)]
+    written = []
+    assert write_terms(collect_chunks(terms, 4), lambda m, c: written.append((m, c))) == 1
+    assert to_lincomb(iter_terms(collect(Sum([A('x'), A('y')])))) is LinComb({A('x'): 1, A('y'): 1})
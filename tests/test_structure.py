@@ -0,0 +1,31 @@
+from fractions import Fraction
+
+from algebra.relations import rtt_commutation_table
+from algebra.serialize import DiskCache
+from algebra.structure import StructureConstants, cached_structure_constants
+
+
+def test_table_matches_commutation_relations():
+    sc = StructureConstants.build(3, 2)
+    table = rtt_commutation_table(3, 2)
+    assert sc.size == 18
+    assert all(sc[pair] == rel for pair, rel in table.items())
+    assert sc.nnz == sum(len(rel) for rel in table.values())
+    g = (1, 2, 2)
+    assert sc.key(sc.gid(g)) == g and sc.key(sc.gid((2, 3, 3))) == (2, 3, 3)
+    a, b = sc.gid((1, 2, 1)), sc.gid((2, 1, 1))
+    assert sorted(sc.commutator(a, b)) == sorted([((sc.gid((1, 1, 1)),), Fraction(-1)),
+                                                   ((sc.gid((2, 2, 1)),), Fraction(1))])
+
+
+def test_persistence(tmp_path):
+    sc = StructureConstants.build(2, 3)
+    path = str(tmp_path / "sc.npz")
+    sc.save(path)
+    loaded = StructureConstants.load(path)
+    assert (loaded.n, loaded.max_level, loaded.nnz) == (2, 3, sc.nnz)
+    assert loaded[(1, 2, 3), (2, 1, 2)] == sc[(1, 2, 3), (2, 1, 2)]
+    cache = DiskCache(str(tmp_path / "cache"))
+    first = cached_structure_constants(2, 3, cache)
+    assert cached_structure_constants(2, 3, cache)[(1, 1, 2), (1, 2, 1)] == first[(1, 1, 2), (1, 2, 1)]
+    assert len(list((tmp_path / "cache").rglob("*.npz"))) == 1
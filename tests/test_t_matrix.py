@@ -0,0 +1,75 @@
+import random
+
+import sympy as sp
+from algebra.generator import T
+from algebra.t_matrix import TSeries, T_matrix
+
+
+def _random_series(shape, order, rng):
+    coeffs = {(i, j, r): rng.randint(-3, 3)
+              for r in range(order + 1) for i in range(1, shape[0] + 1) for j in range(1, shape[1] + 1)}
+    return TSeries.from_coefficients(shape, coeffs, order)
+
+
+def _truncated(M, x, order):
+    # coefficients of x^0..x^order of a polynomial matrix in x = 1/z
+    return [M.applyfunc(lambda e: sp.expand(e).coeff(x, r)) for r in range(order + 1)]
+
+
+def _levels(series):
+    return [sp.Matrix(*series.shape, lambda i, j: series[i + 1, j + 1, r]) for r in range(series.order + 1)]
+
+
+def test_generators_agree_with_t_matrix():
+    z = sp.symbols('z')
+    G = TSeries.generators(3, order=2)
+    assert G[2, 3, 2] == T(2, 3, 2) and G[1, 1, 0] == 1 and G[1, 2, 0] == 0
+    assert G[1, 1, 3] == 0
+    assert G.to_matrix(z) - sp.eye(3) == T_matrix(z, 2, 3)
+    assert TSeries.generators(3, order=2, unit=False).to_matrix(z) == T_matrix(z, 2, 3)
+
+
+def test_product_and_kron_convolve_coefficients():
+    rng = random.Random(3)
+    x = sp.symbols('x')
+    A, B = _random_series((2, 3), 3, rng), _random_series((3, 2), 2, rng)
+    AB = A * B
+    assert AB.shape == (2, 2) and AB.order == 2
+    dense = A.to_matrix(1 / x) * B.to_matrix(1 / x)
+    assert _levels(AB) == _truncated(dense, x, 2)
+    C = _random_series((2, 2), 2, rng)
+    K = A.kron(C)
+    assert K.shape == (4, 6)
+    dense = sp.kronecker_product(A.to_matrix(1 / x), C.to_matrix(1 / x))
+    assert _levels(K) == _truncated(dense, x, 2)
+    I = TSeries.identity(2)
+    assert dict(I.kron(I).level(0)) == {(k, k): 1 for k in range(1, 5)}
+
+
+def test_extend_computes_higher_orders_on_demand():
+    G = TSeries.generators(2, order=1)
+    P = G * G
+    assert P[1, 2, 2] == 0
+    P.extend(3)
+    # (T T)^(3)_12 = sum_{p+q=3} sum_k T_1k^(p) T_k2^(q)
+    expected = 2 * T(1, 2, 3) + sum(T(1, k, p) * T(k, 2, 3 - p) for p in (1, 2) for k in (1, 2))
+    assert sp.expand(P[1, 2, 3] - expected) == 0
+    assert P.truncate(2)[1, 2, 3] == 0
+    S = G + G
+    assert S[2, 1, 1] == 2 * T(2, 1, 1) and S[1, 1, 0] == 2
+
+
+def test_generators_are_interned_and_convert_to_sympy_lazily():
+    import os
+    import pickle
+    import subprocess
+    import sys
+    g = T(1, 2, 3)
+    assert T(1, 2, sp.Integer(3)) is g and pickle.loads(pickle.dumps(g)) is g
+    assert repr(g) == "T_{12}^(3)" and str(sp.sympify(g)) == "T_{12}^(3)"
+    assert sp.expand((g + 1) * 2 - 2 * g) == 2
+    code = ("import sys, algebra, algebra.rewrite, algebra.yangian, algebra.relations, algebra.t_matrix; "
+            "algebra.relations.rtt_commutation_table(2, 2); algebra.t_matrix.TSeries.generators(2) * "
+            "algebra.t_matrix.TSeries.identity(2); assert 'sympy' not in sys.modules")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=root)
@@ -19,3 +19,9 @@ def test_level2_coassociativity():
     right = delta_associative_right(e2)
     # normalize textual reprs — they should match structurally in this simplified model
     assert repr(left) == repr(right)
+
+
+def test_structural_coassociativity_check():
+    from algebra.yangian import is_coassociative
+    assert is_coassociative(A('E1_2'))
+    assert is_coassociative(A('F2_1'))
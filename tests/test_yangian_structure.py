@@ -28,3 +28,52 @@ def test_coproduct_coassociativity_level1():
     s = repr(left)
     # there should be at least two triple-tensor terms (each contributes 2 '⊗')
     assert s.count('⊗') >= 4
+
+
+def test_iterated_coproduct_flat_legs():
+    from algebra.rewrite import MultiTensor, Tensor
+    from algebra.yangian import iterated_delta
+    a, b, c = A('a'), A('b'), A('c')
+    assert MultiTensor([Tensor(Tensor(a, b), c)]) is MultiTensor([a, Tensor(b, c)])
+    assert MultiTensor([a, b, c]).to_tree() is Tensor(Tensor(a, b), c)
+    e2 = A('E1_2')
+    assert iterated_delta(e2, 3) is delta_associative_left(e2)
+    out = iterated_delta(e2, 8)
+    assert all(len(m.legs) == 8 for m, _ in out.items)
+    assert out.coefficient(MultiTensor([e2] + [A('1')] * 7)) == 1
+
+
+def test_coproduct_table_is_shared_and_prepopulated():
+    from algebra.yangian import CoproductTable, GeneratorKey, coproduct_expand, coproduct_table, generator_key
+    assert generator_key('E2_1') == GeneratorKey('E', 2, 1)
+    assert generator_key('not_a_gen') is None
+    table = CoproductTable()
+    table.populate(2, indices=(1, 2))
+    assert len(table) == 1 + 3 * 2 * 3
+    assert table.expand(A('E1_2')) is coproduct_expand(A('E1_2'))
+    assert coproduct_table.expand(A('H2_0')) is delta(A('H2_0'))
+    assert len(table.terms(A('E1_2'))) == 4
+    # other spellings of a generator are expanded as written, not renamed
+    assert {x for x, _, _ in table.terms(A('E01_2'))} == {A('E01_2'), A('1'), A('E1_1'), A('H1_0')}
+    assert table.expand(A('E1_2')) is coproduct_expand(A('E1_2'))
+    assert (A('T012_1'), A('1')) in {(x, y) for x, y, _ in table.terms(A('T012_1'))}
+
+
+def test_rtt_coproduct_of_t_generators():
+    from algebra.yangian import CoproductTable, is_coassociative, iterated_delta
+    one = A('1')
+    assert {(x, y) for x, y, _ in CoproductTable(2).terms(A('T12_2'))} == {
+        (one, A('T12_2')), (A('T11_1'), A('T12_1')), (A('T12_1'), A('T22_1')), (A('T12_2'), one)}
+    table = CoproductTable(3)
+    for level in (1, 6, 8):
+        assert len(table.terms(A(f'T23_{level}'))) == 3 * (level - 1) + 2
+    assert table.expand(A('T11_1')) is delta(A('T11_1'))
+    assert is_coassociative(A('T21_6'))
+    assert len(iterated_delta(A('T12_3'), 3)) == len(delta_associative_left(A('T12_3')))
+    # indices outside gl(n) (or a missing digit) are errors, not empty or truncated sums
+    for bad in ('T33_1', 'T13_2', 'T1_2'):
+        with pytest.raises(ValueError):
+            CoproductTable(2).terms(A(bad))
+    assert len(table.terms(A('T13_2'))) == 5
+    with pytest.raises(AttributeError):
+        table.n = 2